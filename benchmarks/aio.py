@@ -0,0 +1,63 @@
+"""Measure echo subsystem throughput for different worker batch sizes.
+
+Submits bursts of echo submissions and drains completions on the calling
+thread, sleeping on a wakeup when there are none like the system loop does,
+until every callback has been invoked.
+"""
+
+from __future__ import annotations
+
+import time
+
+from pycoro import aio
+from pycoro.app.subsystems.aio import echo
+from pycoro.kernel import t_aio
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.wakeup import Wakeup
+
+
+def throughput(batch_size: int, submissions: int, burst: int) -> float:
+    io = aio.new(burst)
+    io.add_subsystem(echo.new(io, echo.Config(size=burst, batch_size=batch_size, workers=1)))
+    io.start()
+
+    wakeup = Wakeup()
+    completed = 0
+
+    def callback(v: t_aio.Kind | Exception) -> None:
+        nonlocal completed
+        assert not isinstance(v, Exception)
+        completed += 1
+
+    start = time.perf_counter()
+    submitted = 0
+    while completed < submissions:
+        while submitted < submissions and submitted - completed < burst:
+            io.enqueue_sqe(SQE[t_aio.Kind, t_aio.Kind](callback, echo.EchoSubmission("foo")))
+            submitted += 1
+
+        cqes = io.dequeue_cqe(burst)
+        for cqe in cqes:
+            cqe.invoke()
+
+        if len(cqes) == 0:
+            io.signal(wakeup)
+            _ = wakeup.wait()
+    elapsed = time.perf_counter() - start
+
+    io.stop()
+    return submissions / elapsed
+
+
+def main() -> None:
+    submissions = 200_000
+    burst = 1_000
+
+    print(f"echo throughput ({submissions:,} submissions, bursts of {burst:,})")
+    for batch_size in (1, 10, 100):
+        ops = throughput(batch_size, submissions, burst)
+        print(f"  batch size {batch_size:>3} {ops:>12,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure submission throughput of per-item versus bulk API enqueue.
+
+Pushes requests through the API submission queue in batches, either one
+enqueue_sqe call per request or one enqueue_sqes call per batch, and drains
+the queue with dequeue_sqe after every batch the way a system tick would.
+Bulk enqueue takes the queue lock once per batch instead of once per request.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from pycoro.api import new as new_api
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.t_api.request import Request
+from pycoro.kernel.t_api.response import Response
+
+
+@dataclass(frozen=True)
+class EchoRequest:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+def throughput(requests: int, batch_size: int, *, bulk: bool) -> float:
+    api = new_api(batch_size)
+    batch = [
+        SQE[Request[Any], Response[Any]](
+            submission=Request(payload=EchoRequest(data=str(i))), callback=lambda _: None
+        )
+        for i in range(batch_size)
+    ]
+
+    start = time.perf_counter()
+    for _ in range(requests // batch_size):
+        if bulk:
+            _ = api.enqueue_sqes(batch)
+        else:
+            for sqe in batch:
+                api.enqueue_sqe(sqe)
+        assert len(api.dequeue_sqe(batch_size)) == batch_size
+    return requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    requests = 200_000
+
+    print(f"api submission throughput ({requests:,} requests)")
+    for batch_size in [1, 10, 100, 1_000]:
+        per_item = throughput(requests, batch_size, bulk=False)
+        bulk = throughput(requests, batch_size, bulk=True)
+        speedup = bulk / per_item
+        print(f"  batch {batch_size:>5} per item {per_item:>12,.0f} req/s", end="")
+        print(f"  bulk {bulk:>12,.0f} req/s  ({speedup:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Compare thread-backed and generator-backed coroutines.
+
+Reports resumes per second for coroutines that emit against an IO which
+completes immediately, and memory per in-flight coroutine for coroutines
+parked on a promise that is never completed.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+import pycoro
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+
+type Func = pycoro.CoroutineFunc[int, int, int] | pycoro.GeneratorFunc[int, int, int]
+
+
+class _IO:
+    def dispatch(self, v: int | None, cb: Callable[[int | Exception], None]) -> None:
+        assert v is not None
+        cb(v)
+
+
+def thread_emitter(n: int) -> pycoro.CoroutineFunc[int, int, int]:
+    def _(c: pycoro.Coroutine[int, int, int]) -> int:
+        for i in range(n):
+            _ = pycoro.emit_and_wait(c, i)
+        return n
+
+    return _
+
+
+def generator_emitter(n: int) -> pycoro.GeneratorFunc[int, int, int]:
+    def _(c: pycoro.GeneratorCoroutine[int, int, int]) -> Generator[Any, Any, int]:
+        for i in range(n):
+            _ = yield pycoro.emit_and_wait(c, i)
+        return n
+
+    return _
+
+
+def thread_parked(p: Future[int]) -> pycoro.CoroutineFunc[int, int, int]:
+    def _(c: pycoro.Coroutine[int, int, int]) -> int:
+        return pycoro.wait(c, p)
+
+    return _
+
+
+def generator_parked(p: Future[int]) -> pycoro.GeneratorFunc[int, int, int]:
+    def _(c: pycoro.GeneratorCoroutine[int, int, int]) -> Generator[Any, Any, int]:
+        return (yield pycoro.wait(c, p))
+
+    return _
+
+
+def resumes_per_second(
+    f: Callable[[int], Func],
+    coroutines: int,
+    emits: int,
+) -> float:
+    s = pycoro.Scheduler(_IO(), coroutines)
+    for _ in range(coroutines):
+        assert pycoro.add(s, f(emits)) is not None
+
+    start = time.perf_counter()
+    while s.size() > 0:
+        s.run_until_blocked(0)
+    elapsed = time.perf_counter() - start
+
+    s.shutdown()
+
+    # every emit resumes once, the promise is completed by the time it is
+    # awaited, plus the final resume that runs the coroutine to completion
+    return coroutines * (emits + 1) / elapsed
+
+
+def memory_per_coroutine(
+    f: Callable[[Future[int]], Func],
+    coroutines: int,
+) -> tuple[float, int]:
+    p = Future[int]()
+    s = pycoro.Scheduler(_IO(), coroutines)
+    threads = threading.active_count()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(coroutines):
+        assert pycoro.add(s, f(p)) is not None
+    s.run_until_blocked(0)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    parked = threading.active_count() - threads
+
+    p.set_result(0)
+    while s.size() > 0:
+        s.run_until_blocked(0)
+    s.shutdown()
+
+    return (after - before) / coroutines, parked
+
+
+def main() -> None:
+    coroutines = 1_000
+    emits = 100
+
+    print(f"resumes/sec ({coroutines} coroutines x {emits} emits)")
+    for name, emitter in (("thread", thread_emitter), ("generator", generator_emitter)):
+        print(f"  {name:<10} {resumes_per_second(emitter, coroutines, emits):>12,.0f}")
+
+    print(f"memory per in-flight coroutine ({coroutines} parked)")
+    for name, parked in (("thread", thread_parked), ("generator", generator_parked)):
+        size, threads = memory_per_coroutine(parked, coroutines)
+        stack = threading.stack_size() or "default"
+        print(f"  {name:<10} {size:>10,.0f} B heap, {threads} threads (stack size: {stack})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Compare function subsystem modes on CPU-bound work across 1-8 workers.
+
+Submits a fixed number of calls to a pure Python function and drains
+completions on the calling thread until every callback has been invoked.
+Thread mode is serialised by the GIL, the other modes should scale with the
+number of workers where the runtime supports them; modes the runtime does not
+support fall back to threads and are reported as such.
+"""
+
+from __future__ import annotations
+
+import time
+
+from pycoro import aio
+from pycoro.app.subsystems.aio import function
+from pycoro.kernel import t_aio
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.wakeup import Wakeup
+
+
+def fib(n: int) -> int:
+    return n if n < 2 else fib(n - 1) + fib(n - 2)  # noqa: PLR2004
+
+
+def elapsed(mode: function.Mode, workers: int, calls: int, n: int) -> tuple[str, float]:
+    io = aio.new(calls)
+    f = function.new(io, function.Config(size=calls, batch_size=1, workers=workers, mode=mode))
+    io.add_subsystem(f)
+    io.start()
+
+    wakeup = Wakeup()
+    completed = 0
+
+    def callback(v: t_aio.Kind | Exception) -> None:
+        nonlocal completed
+        assert not isinstance(v, Exception)
+        completed += 1
+
+    start = time.perf_counter()
+    submission = function.FunctionSubmission(fib, (n,))
+    for _ in range(calls):
+        io.enqueue_sqe(SQE[t_aio.Kind, t_aio.Kind](callback, submission))
+
+    while completed < calls:
+        cqes = io.dequeue_cqe(calls)
+        for cqe in cqes:
+            cqe.invoke()
+
+        if len(cqes) == 0:
+            io.signal(wakeup)
+            _ = wakeup.wait()
+    result = time.perf_counter() - start
+
+    io.stop()
+    return f.mode, result
+
+
+def main() -> None:
+    calls = 32
+    n = 25
+
+    print(f"function subsystem ({calls} calls of fib({n}))")
+    modes: tuple[function.Mode, ...] = ("thread", "process", "interpreter", "parallel")
+    for mode in modes:
+        for workers in (1, 2, 4, 8):
+            resolved, seconds = elapsed(mode, workers, calls, n)
+            print(f"  {mode:<11} ({resolved:<11}) workers {workers} {seconds:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
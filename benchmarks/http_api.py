@@ -0,0 +1,131 @@
+"""Measure HTTP API throughput with and without pipelining.
+
+Runs a system behind the HTTP subsystem with an echo coroutine and has 1 and 8
+keep-alive connections send requests either one at a time or pipelined 16
+deep. Everything runs in one process, so on a single core the client competes
+with the server and the system for the GIL.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+import pycoro
+from pycoro.aio import new as new_aio
+from pycoro.api import new as new_api
+from pycoro.app.subsystems.aio import echo
+from pycoro.app.subsystems.api import http
+from pycoro.kernel import system
+from pycoro.kernel.t_api.response import Response
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from pycoro.kernel.t_aio import Kind
+    from pycoro.kernel.t_api.request import Request
+
+
+@dataclass(frozen=True)
+class EchoRequest:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+@dataclass(frozen=True)
+class EchoResponse:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def is_response_payload(self) -> Literal[True]:
+        return True
+
+
+def echo_coroutine(
+    c: pycoro.Coroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Response[EchoResponse]:
+    completion = pycoro.emit_and_wait(c, echo.EchoSubmission(r.payload.data))
+    assert isinstance(completion, echo.EchoCompletion)
+    return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(completion.data))
+
+
+REQUEST = b'POST /echo HTTP/1.1\r\nContent-Length: 13\r\n\r\n{"data": "x"}'
+
+
+async def client(host: str, port: int, requests: int, depth: int) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+
+    sent = 0
+    while sent < requests:
+        n = min(depth, requests - sent)
+        writer.write(REQUEST * n)
+        sent += n
+
+        for _ in range(n):
+            head = await reader.readuntil(b"\r\n\r\n")
+            assert head.startswith(b"HTTP/1.1 200")
+            length = int(head.split(b"Content-Length: ")[1].split(b"\r\n")[0])
+            _ = await reader.readexactly(length)
+
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(host: str, port: int, connections: int, requests: int, depth: int) -> float:
+    start = time.perf_counter()
+    _ = await asyncio.gather(*(client(host, port, requests, depth) for _ in range(connections)))
+    return connections * requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    aio = new_aio(1000)
+    api = new_api(1000)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=1000, batch_size=100, workers=1)))
+
+    server = http.new(api, http.Config(max_inflight=16))
+    server.route("POST", "/echo", lambda body: EchoRequest(**json.loads(body)))
+    api.add_subsystems(server)
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(
+            coroutine_max_size=1000, submission_batch_size=100, completion_batch_size=100
+        ),
+    )
+    s.add_on_request("echo", echo_coroutine)
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    _ = server.started.wait()
+    host, port = api.addr().rsplit(":", 1)
+    requests = 2_000
+
+    print(f"http throughput ({requests:,} requests per connection)")
+    for connections in [1, 8]:
+        one = asyncio.run(load(host, int(port), connections, requests, 1))
+        piped = asyncio.run(load(host, int(port), connections, requests, 16))
+        print(f"  {connections} connections  one at a time {one:>8,.0f} req/s", end="")
+        print(f"  pipelined {piped:>8,.0f} req/s  ({piped / one:.1f}x)")
+
+    _ = s.shutdown().wait()
+    loop.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure how long interactive coroutines wait to run during a bulk flood.
+
+Keeps a flood of bulk generator coroutines emitting against an IO that
+completes immediately while a trickle of interactive coroutines is added
+every tick, then reports the mean and max time each class spent runnable.
+With a single class interactive coroutines queue behind the flood, with
+weighted classes they are served ahead of it.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import pycoro
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator, Mapping
+
+
+class _IO:
+    def dispatch(self, v: int | None, cb: Callable[[int | Exception], None]) -> None:
+        assert v is not None
+        cb(v)
+
+
+def emitter(emits: int) -> pycoro.GeneratorFunc[int, int, None]:
+    def _(c: pycoro.GeneratorCoroutine[int, int, None]) -> Generator[Any, Any]:
+        for i in range(emits):
+            _ = yield pycoro.emit(c, i)
+
+    return _
+
+
+def flood(
+    weights: Mapping[str, int], priorities: tuple[str, str], bulk: int, ticks: int
+) -> dict[str, tuple[float, float]]:
+    interactive, flooding = priorities
+    s = pycoro.Scheduler(_IO(), bulk + ticks * 10, weights=weights)
+    for _ in range(bulk):
+        assert pycoro.add(s, emitter(ticks), priority=flooding)
+
+    for i in range(ticks):
+        for _ in range(10):
+            assert pycoro.add(s, emitter(1), priority=interactive)
+        s.run_until_blocked(i)
+    s.shutdown()
+
+    return {
+        name: (stats.waited_ns / max(stats.steps, 1) / 1e3, stats.max_waited_ns / 1e3)
+        for name, stats in s.stats().items()
+    }
+
+
+def main() -> None:
+    bulk = 10_000
+    ticks = 20
+
+    print(f"runnable wait ({bulk:,} bulk coroutines, 10 interactive per tick)")
+    cases: list[tuple[str, Mapping[str, int], tuple[str, str]]] = [
+        ("fifo", {"default": 1}, ("default", "default")),
+        ("weighted", {"interactive": 8, "bulk": 1}, ("interactive", "bulk")),
+    ]
+    for name, weights, priorities in cases:
+        for cls, (mean, worst) in flood(weights, priorities, bulk, ticks).items():
+            print(f"  {name:<8} {cls:<11} mean {mean:>10,.1f} us  max {worst:>10,.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measure queue throughput under producer contention.
+
+Has 1, 4 and 16 producer threads put items into a bounded queue while a
+single consumer drains it in batches, the way the API submission queue and
+subsystem queues are used, and compares queue.Queue against Ring. Capacity
+covers every item so producers never wait for room.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from queue import Empty, Queue
+
+from pycoro.kernel.ring import Ring
+
+
+def queue_throughput(producers: int, items: int, batch_size: int) -> float:
+    q = Queue[int](producers * items)
+
+    def produce() -> None:
+        for i in range(items):
+            q.put_nowait(i)
+
+    threads = [threading.Thread(target=produce) for _ in range(producers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    consumed = 0
+    while consumed < producers * items:
+        _ = q.get()
+        consumed += 1
+        for _ in range(batch_size - 1):
+            try:
+                _ = q.get_nowait()
+            except Empty:
+                break
+            consumed += 1
+
+    for t in threads:
+        t.join()
+    return producers * items / (time.perf_counter() - start)
+
+
+def ring_throughput(producers: int, items: int, batch_size: int) -> float:
+    ring = Ring[int](producers * items)
+
+    def produce() -> None:
+        for i in range(items):
+            _ = ring.put_nowait(i)
+
+    threads = [threading.Thread(target=produce) for _ in range(producers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+
+    consumed = 0
+    while consumed < producers * items:
+        _ = ring.get()
+        consumed += 1 + len(ring.pop(batch_size - 1))
+
+    for t in threads:
+        t.join()
+    return producers * items / (time.perf_counter() - start)
+
+
+def main() -> None:
+    items = 100_000
+    batch_size = 100
+
+    print(f"queue throughput ({items:,} items per producer, batches of {batch_size})")
+    for producers in [1, 4, 16]:
+        q = queue_throughput(producers, items, batch_size)
+        r = ring_throughput(producers, items, batch_size)
+        print(f"  {producers:>2} producers queue {q:>12,.0f} items/s", end="")
+        print(f"  ring {r:>12,.0f} items/s  ({r / q:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure scheduler tick cost with many parked coroutines.
+
+Parks N generator coroutines on their own promise, then completes a fixed
+number of promises per tick. The cost of a tick should follow the number of
+coroutines that became runnable, not the number of parked coroutines.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+import pycoro
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+
+class _IO:
+    def dispatch(self, v: int | None, cb: Callable[[int | Exception], None]) -> None:
+        assert v is not None
+        cb(v)
+
+
+def parked(p: Future[int]) -> pycoro.GeneratorFunc[int, int, int]:
+    def _(c: pycoro.GeneratorCoroutine[int, int, int]) -> Generator[Any, Any, int]:
+        return (yield pycoro.wait(c, p))
+
+    return _
+
+
+def tick_cost(coroutines: int, wakeups: int, ticks: int) -> float:
+    promises = [Future[int]() for _ in range(coroutines)]
+    s = pycoro.Scheduler(_IO(), coroutines)
+    for p in promises:
+        assert pycoro.add(s, parked(p)) is not None
+    s.run_until_blocked(0)
+
+    elapsed = 0.0
+    for i in range(ticks):
+        for p in promises[i * wakeups : (i + 1) * wakeups]:
+            p.set_result(i)
+
+        start = time.perf_counter()
+        s.tick(i)
+        elapsed += time.perf_counter() - start
+
+    for p in promises[ticks * wakeups :]:
+        p.set_result(0)
+    s.tick(ticks)
+    assert s.size() == 0
+    s.shutdown()
+
+    return elapsed / ticks
+
+
+def main() -> None:
+    wakeups = 100
+    ticks = 10
+
+    print(f"tick cost ({wakeups} wakeups per tick)")
+    for coroutines in (1_000, 10_000, 100_000):
+        cost = tick_cost(coroutines, wakeups, ticks)
+        print(f"  {coroutines:>7,} parked {cost * 1e6:>10,.1f} us/tick")
+
+
+if __name__ == "__main__":
+    main()
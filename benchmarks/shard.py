@@ -0,0 +1,138 @@
+"""Measure end-to-end request throughput of a sharded system.
+
+Routes echo requests round robin to 1..N shard processes, each running its
+own system, and keeps a fixed number of requests in flight until every
+response has come back. Throughput should scale with shards up to the number
+of cores.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+import pycoro
+from pycoro.aio import new as new_aio
+from pycoro.api import new as new_api
+from pycoro.app.subsystems.aio import echo
+from pycoro.kernel import shard, system
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.t_api.request import Request
+from pycoro.kernel.t_api.response import Response
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from pycoro.kernel.t_aio import Kind
+
+
+@dataclass(frozen=True)
+class EchoRequest:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+@dataclass(frozen=True)
+class EchoResponse:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def is_response_payload(self) -> Literal[True]:
+        return True
+
+
+def echo_coroutine(
+    c: pycoro.GeneratorCoroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Generator[Any, Any, Response[EchoResponse]]:
+    # some cpu work per request so shards have something to scale
+    data = r.payload.data
+    for _ in range(200):
+        data = str(hash(data))
+
+    completion = yield pycoro.emit_and_wait(c, echo.EchoSubmission(data))
+    assert isinstance(completion, echo.EchoCompletion)
+    return Response(StatusCode.STATUS_OK, EchoResponse(completion.data))
+
+
+def build() -> shard.System:
+    aio = new_aio(1_000)
+    api = new_api(1_000)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=1_000)))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(
+            coroutine_max_size=1_000, submission_batch_size=100, completion_batch_size=100
+        ),
+    )
+    s.add_on_request("echo", echo_coroutine)
+    return s
+
+
+def throughput(shards: int, requests: int, in_flight: int) -> float:
+    s = shard.new(build, shard.Config(shards=shards))
+    s.start()
+
+    window = threading.Semaphore(in_flight)
+    done = threading.Event()
+    completed = 0
+    lock = threading.Lock()
+
+    def callback(res: Response[Any] | Exception) -> None:
+        nonlocal completed
+        assert not isinstance(res, Exception)
+        window.release()
+        with lock:
+            completed += 1
+            if completed == requests:
+                done.set()
+
+    # warm up so process start up is not measured
+    for _ in range(shards):
+        _ = window.acquire()
+        s.enqueue_sqe(SQE[Request[Any], Response[Any]](callback, Request(EchoRequest("foo"))))
+    for _ in range(shards):
+        _ = window.acquire()
+    for _ in range(shards):
+        window.release()
+    completed = 0
+
+    start = time.perf_counter()
+    for i in range(requests):
+        _ = window.acquire()
+        s.enqueue_sqe(SQE[Request[Any], Response[Any]](callback, Request(EchoRequest(str(i)))))
+    _ = done.wait()
+    elapsed = time.perf_counter() - start
+
+    s.shutdown()
+    return requests / elapsed
+
+
+def main() -> None:
+    requests = 20_000
+    in_flight = 500
+
+    print(f"sharded throughput ({requests:,} requests, {in_flight} in flight)")
+    for shards in sorted({1, 2, 4, os.cpu_count() or 1}):
+        print(f"  {shards:>2} shards {throughput(shards, requests, in_flight):>12,.0f} req/s")
+
+
+if __name__ == "__main__":
+    main()
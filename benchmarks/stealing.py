@@ -0,0 +1,67 @@
+"""Compare the work-stealing scheduler with the single-threaded one.
+
+Runs generator coroutines that do some pure Python work between emits
+against an IO that completes immediately, and reports the time to run all
+of them to completion. The work-stealing scheduler only scales when the GIL
+is disabled, with the GIL it shows the cost of the extra coordination.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from typing import TYPE_CHECKING, Any
+
+import pycoro
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
+
+class _IO:
+    def dispatch(self, v: int | None, cb: Callable[[int | Exception], None]) -> None:
+        assert v is not None
+        cb(v)
+
+
+def worker(emits: int, work: int) -> pycoro.GeneratorFunc[int, int, int]:
+    def _(c: pycoro.GeneratorCoroutine[int, int, int]) -> Generator[Any, Any, int]:
+        total = 0
+        for i in range(emits):
+            for j in range(work):
+                total += j * j
+            _ = yield pycoro.emit(c, i)
+        return total
+
+    return _
+
+
+def elapsed(workers: int, coroutines: int, emits: int, work: int) -> float:
+    s = pycoro.Scheduler(_IO(), coroutines, workers=workers)
+    for _ in range(coroutines):
+        assert pycoro.add(s, worker(emits, work)) is not None
+
+    start = time.perf_counter()
+    s.run_until_blocked(0)
+    result = time.perf_counter() - start
+
+    assert s.size() == 0
+    s.shutdown()
+    return result
+
+
+def main() -> None:
+    coroutines = 1_000
+    emits = 10
+    work = 1_000
+    gil = sys._is_gil_enabled()  # noqa: SLF001  # pyright: ignore[reportPrivateUsage]
+
+    print(f"scheduler scaling ({coroutines:,} coroutines x {emits} emits, gil enabled: {gil})")
+    for workers in (1, 2, 4, 8):
+        kind = "single" if workers == 1 else "stealing"
+        seconds = elapsed(workers, coroutines, emits, work)
+        print(f"  {kind:<8} workers {workers} {seconds:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
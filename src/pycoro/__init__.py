@@ -1,12 +1,15 @@
 from __future__ import annotations
 
+import inspect
 import queue
-from collections.abc import Callable
+import types
+from collections.abc import Awaitable, Callable, Generator, Iterable, Mapping, Sequence
 from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Any, Final, Protocol
+from threading import Lock
+from typing import Any, Final, Protocol, TypeIs, overload
 
-from pycoro import scheduler
+from pycoro import scheduler, stealing
 
 
 # Coroutine
@@ -15,6 +18,8 @@ class Coroutine[T, TNext, TReturn](Protocol):
     def set(self, key: str, value: Any) -> None: ...
     def get(self, key: str) -> Any: ...
     def resources(self) -> dict[str, Any]: ...
+    def deadline(self) -> int | None: ...
+    def priority(self) -> str: ...
     def emit_and_wait(self, e: _Emit[T, TNext, TReturn]) -> None: ...
     def executor(self) -> ThreadPoolExecutor: ...
 
@@ -22,32 +27,82 @@ class Coroutine[T, TNext, TReturn](Protocol):
 type CoroutineFunc[T, TNext, TReturn] = Callable[[Coroutine[T, TNext, TReturn]], TReturn]
 
 
+class GeneratorCoroutine[T, TNext, TReturn](Protocol):
+    def time(self) -> int: ...
+    def set(self, key: str, value: Any) -> None: ...
+    def get(self, key: str) -> Any: ...
+    def resources(self) -> dict[str, Any]: ...
+    def deadline(self) -> int | None: ...
+    def priority(self) -> str: ...
+    def suspend[R](self, e: _Emit[T, TNext, TReturn], result: Callable[[], R]) -> _Suspend[R]: ...
+    def executor(self) -> ThreadPoolExecutor: ...
+
+
+type GeneratorFunc[T, TNext, TReturn] = Callable[
+    [GeneratorCoroutine[T, TNext, TReturn]], Generator[Any, Any, TReturn]
+]
+
+# async coroutines are driven exactly like generator coroutines, awaiting a
+# pycoro operation yields it to the scheduler
+type AsyncCoroutine[T, TNext, TReturn] = GeneratorCoroutine[T, TNext, TReturn]
+
+type AsyncFunc[T, TNext, TReturn] = Callable[
+    [AsyncCoroutine[T, TNext, TReturn]], types.CoroutineType[Any, Any, TReturn]
+]
+
+type AnyCoroutineFunc[T, TNext, TReturn] = (
+    CoroutineFunc[T, TNext, TReturn]
+    | GeneratorFunc[T, TNext, TReturn]
+    | AsyncFunc[T, TNext, TReturn]
+)
+
+
 @dataclass(frozen=True)
 class _Emit[T, TNext, TReturn]:
-    value: T | None = None
-    promise: Future[TNext] | None = None
+    values: tuple[T, ...] = ()
+    promises: tuple[Future[TNext], ...] = ()
     spawn: scheduler.Coroutine[T, TNext] | None = None
     wait: Future[Any] | None = None
+    deadline: int | None = None
     done: bool = False
 
 
+@dataclass(frozen=True)
+class _Suspend[R]:
+    emit: _Emit[Any, Any, Any]
+    result: Callable[[], R]
+
+    def __await__(self) -> Generator[_Suspend[R], Any, R]:
+        return (yield self)
+
+
 class _Coroutine[T, TNext, TReturn]:
     def __init__(
         self,
         f: CoroutineFunc[T, TNext, TReturn],
         r: dict[str, Any],
         executor: ThreadPoolExecutor,
+        deadline: int | None,
+        priority: str,
     ) -> None:
         self._f: Final = f
         self._r: Final = r
         self._executor: Final = executor
+        self._deadline: Final = deadline
+        self._priority: Final = priority
         self.p: Final = Future[TReturn]()
         self._t: int
 
+        # deadline of the current wait, if it passes the wait raises a timeout
+        self._expires: int | None = None
+        self._expired: bool = False
+
         self._c_i: Final = queue.Queue[Any]()
         self._c_o: Final = queue.Queue[_Emit[T, TNext, TReturn]]()
 
-        _ = self._executor.submit(self._worker)
+        # the worker thread is only taken on the first resume, a coroutine that
+        # is never admitted never holds one
+        self._started: bool = False
 
     def _worker(self) -> None:
         self._c_i.get()
@@ -65,19 +120,38 @@ class _Coroutine[T, TNext, TReturn]:
     def resume(
         self,
     ) -> tuple[
-        T | None,
-        Future[TNext] | None,
+        tuple[T, ...],
+        tuple[Future[TNext], ...],
         scheduler.Coroutine[T, TNext] | None,
         Future[Any] | None,
         bool,
     ]:
-        self._c_i.put(None)
+        if not self._started:
+            self._started = True
+            _ = self._executor.submit(self._worker)
+
+        if self._expired:
+            self._expired = False
+            self._c_i.put(_timeout())
+        else:
+            self._c_i.put(None)
+
         o = self._c_o.get()
-        return o.value, o.promise, o.spawn, o.wait, o.done
+        self._expires = o.deadline
+        return o.values, o.promises, o.spawn, o.wait, o.done
 
     def set_time(self, time: int) -> None:
         self._t = time
 
+    def expires(self) -> int | None:
+        return self._expires
+
+    def expire(self) -> None:
+        self._expired = True
+
+    def reject(self, e: Exception) -> None:
+        self.p.set_exception(e)
+
     def time(self) -> int:
         return self._t
 
@@ -90,37 +164,252 @@ class _Coroutine[T, TNext, TReturn]:
     def resources(self) -> dict[str, Any]:
         return self._r
 
+    def deadline(self) -> int | None:
+        return self._deadline
+
+    def priority(self) -> str:
+        return self._priority
+
     def emit_and_wait(self, e: _Emit[T, TNext, TReturn]) -> None:
         self._c_o.put(e)
-        self._c_i.get()
+        if isinstance(error := self._c_i.get(), TimeoutError):
+            raise error
+
+    def executor(self) -> ThreadPoolExecutor:
+        return self._executor
+
+
+class _GeneratorCoroutine[T, TNext, TReturn]:
+    def __init__(
+        self,
+        f: GeneratorFunc[T, TNext, TReturn] | AsyncFunc[T, TNext, TReturn],
+        r: dict[str, Any],
+        executor: ThreadPoolExecutor,
+        deadline: int | None,
+        priority: str,
+    ) -> None:
+        self._f: Final = f
+        self._r: Final = r
+        self._executor: Final = executor
+        self._deadline: Final = deadline
+        self._priority: Final = priority
+        self.p: Final = Future[TReturn]()
+        self._t: int
+
+        # deadline of the current wait, if it passes the wait raises a timeout
+        self._expires: int | None = None
+        self._expired: bool = False
+
+        # generators delegated to by yielding a generator are stacked on top of
+        # the coroutine's own generator, the top of the stack is always driven
+        self._stack: list[
+            Generator[_Suspend[Any] | Generator[Any, Any, Any], Any, Any]
+            | types.CoroutineType[_Suspend[Any], Any, Any]
+        ] = []
+        self._s: _Suspend[Any] | None = None
+
+    def resume(
+        self,
+    ) -> tuple[
+        tuple[T, ...],
+        tuple[Future[TNext], ...],
+        scheduler.Coroutine[T, TNext] | None,
+        Future[Any] | None,
+        bool,
+    ]:
+        if self._s is None:
+            self._stack.append(self._f(self))
+            s = self._advance(None, None)
+        elif self._expired:
+            self._expired = False
+            s = self._advance(None, _timeout())
+        else:
+            s = self._advance(*_result(self._s))
+
+        self._s = s
+        if s is None:
+            self._expires = None
+            return (), (), None, None, True
+
+        self._expires = s.emit.deadline
+        return s.emit.values, s.emit.promises, s.emit.spawn, s.emit.wait, s.emit.done
+
+    def _advance(self, value: Any, error: Exception | None) -> _Suspend[Any] | None:
+        while True:
+            g = self._stack[-1]
+            try:
+                y = g.send(value) if error is None else g.throw(error)
+            except StopIteration as e:
+                _ = self._stack.pop()
+                if len(self._stack) == 0:
+                    self.p.set_result(e.value)
+                    return None
+                value, error = e.value, None
+                continue
+            except Exception as e:
+                _ = self._stack.pop()
+                if len(self._stack) == 0:
+                    self.p.set_exception(e)
+                    return None
+                value, error = None, e
+                continue
+
+            if isinstance(y, Generator):
+                self._stack.append(y)
+                value, error = None, None
+                continue
+
+            # anything else is a mistake in this coroutine alone, it fails at
+            # the yield instead of taking the scheduler down with it
+            if not isinstance(y, _Suspend):  # pyright: ignore[reportUnnecessaryIsInstance]
+                msg = f"coroutines must yield pycoro operations, got {y!r}"
+                value, error = None, TypeError(msg)
+                continue
+
+            # waiting on a completed promise does not need the scheduler
+            if y.emit.wait is not None and y.emit.wait.done():
+                value, error = _result(y)
+                continue
+
+            return y
+
+    def set_time(self, time: int) -> None:
+        self._t = time
+
+    def expires(self) -> int | None:
+        return self._expires
+
+    def expire(self) -> None:
+        self._expired = True
+
+    def reject(self, e: Exception) -> None:
+        self.p.set_exception(e)
+
+    def time(self) -> int:
+        return self._t
+
+    def set(self, key: str, value: Any) -> None:
+        self._r[key] = value
+
+    def get(self, key: str) -> Any:
+        return self._r[key]
+
+    def resources(self) -> dict[str, Any]:
+        return self._r
+
+    def deadline(self) -> int | None:
+        return self._deadline
+
+    def priority(self) -> str:
+        return self._priority
+
+    def suspend[R](self, e: _Emit[T, TNext, TReturn], result: Callable[[], R]) -> _Suspend[R]:
+        return _Suspend(e, result)
 
     def executor(self) -> ThreadPoolExecutor:
         return self._executor
 
 
+def _timeout() -> TimeoutError:
+    msg = "deadline exceeded"
+    return TimeoutError(msg)
+
+
+def _result(s: _Suspend[Any]) -> tuple[Any, Exception | None]:
+    assert s.emit.wait is None or s.emit.wait.done(), "promise must be completed"
+    try:
+        return s.result(), None
+    except Exception as e:
+        return None, e
+
+
+def _threaded[T, TNext, TReturn](
+    f: AnyCoroutineFunc[T, TNext, TReturn],
+) -> TypeIs[CoroutineFunc[T, TNext, TReturn]]:
+    return not inspect.isgeneratorfunction(f) and not inspect.iscoroutinefunction(f)
+
+
+def _generator[T, TNext, TReturn](
+    f: AnyCoroutineFunc[T, TNext, TReturn],
+) -> TypeIs[GeneratorFunc[T, TNext, TReturn]]:
+    return inspect.isgeneratorfunction(f)
+
+
+def _async[T, TNext, TReturn](
+    f: AnyCoroutineFunc[T, TNext, TReturn],
+) -> TypeIs[AsyncFunc[T, TNext, TReturn]]:
+    return inspect.iscoroutinefunction(f)
+
+
+def _cooperative[T, TNext, TReturn](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+) -> TypeIs[GeneratorCoroutine[T, TNext, TReturn]]:
+    return isinstance(c, _GeneratorCoroutine)
+
+
+def _coroutine[T, TNext, TReturn](
+    f: AnyCoroutineFunc[T, TNext, TReturn],
+    r: dict[str, Any],
+    executor: ThreadPoolExecutor,
+    deadline: int | None,
+    priority: str,
+) -> _Coroutine[T, TNext, TReturn] | _GeneratorCoroutine[T, TNext, TReturn]:
+    if _threaded(f):
+        return _Coroutine[T, TNext, TReturn](f, r, executor, deadline, priority)
+    if _generator(f) or _async(f):
+        return _GeneratorCoroutine[T, TNext, TReturn](f, r, executor, deadline, priority)
+
+    msg = "unreachable"
+    raise AssertionError(msg)
+
+
 # Public API
 
 
 class _Scheduler[I, O](Protocol):
     def add(self, c: scheduler.Coroutine[I, O]) -> bool: ...
-    def run_until_blocked(self, time: int) -> None: ...
+    def run_until_blocked(
+        self, time: int, max_steps: int | None = None, max_ns: int | None = None
+    ) -> None: ...
     def shutdown(self) -> None: ...
     def size(self) -> int: ...
-    def tick(self, time: int) -> None: ...
+    def tick(self, time: int, max_steps: int | None = None, max_ns: int | None = None) -> None: ...
     def step(self, time: int) -> bool: ...
+    def next_deadline(self) -> int | None: ...
+    def gauges(self) -> scheduler.Gauges: ...
+    def stats(self) -> dict[str, scheduler.ClassStats]: ...
     def executor(self) -> ThreadPoolExecutor: ...
 
 
 class Scheduler[I, O]:
-    def __init__(self, io: scheduler.IO[I, O], size: int) -> None:
-        self._executor: Final = ThreadPoolExecutor(max_workers=size)
-        self._s: Final = scheduler.Scheduler[I, O](io, size)
+    def __init__(
+        self,
+        io: scheduler.IO[I, O],
+        size: int,
+        spawn_size: int | None = None,
+        weights: Mapping[str, int] | None = None,
+        workers: int = 1,
+    ) -> None:
+        if spawn_size is None:
+            spawn_size = size
+
+        # every live thread coroutine holds a worker thread
+        self._executor: Final = ThreadPoolExecutor(max_workers=size + spawn_size)
+
+        # more than one worker only pays off on a free-threaded build
+        self._s: Final = (
+            scheduler.Scheduler[I, O](io, size, spawn_size, weights)
+            if workers == 1
+            else stealing.Scheduler[I, O](io, size, spawn_size, weights, workers)
+        )
 
     def add(self, c: scheduler.Coroutine[I, O]) -> bool:
         return self._s.add(c)
 
-    def run_until_blocked(self, time: int) -> None:
-        return self._s.run_until_blocked(time)
+    def run_until_blocked(
+        self, time: int, max_steps: int | None = None, max_ns: int | None = None
+    ) -> None:
+        return self._s.run_until_blocked(time, max_steps, max_ns)
 
     def shutdown(self) -> None:
         self._s.shutdown()
@@ -129,51 +418,307 @@ class Scheduler[I, O]:
     def size(self) -> int:
         return self._s.size()
 
-    def tick(self, time: int) -> None:
-        return self._s.tick(time)
+    def tick(self, time: int, max_steps: int | None = None, max_ns: int | None = None) -> None:
+        return self._s.tick(time, max_steps, max_ns)
 
     def step(self, time: int) -> bool:
         return self._s.step(time)
 
+    def next_deadline(self) -> int | None:
+        return self._s.next_deadline()
+
+    def gauges(self) -> scheduler.Gauges:
+        return self._s.gauges()
+
+    def stats(self) -> dict[str, scheduler.ClassStats]:
+        return self._s.stats()
+
     def executor(self) -> ThreadPoolExecutor:
         return self._executor
 
 
 def add[T, TNext, TReturn](
-    s: _Scheduler[T, TNext], f: CoroutineFunc[T, TNext, TReturn]
+    s: _Scheduler[T, TNext],
+    f: AnyCoroutineFunc[T, TNext, TReturn],
+    deadline: int | None = None,
+    priority: str = scheduler.DEFAULT_PRIORITY,
 ) -> Future[TReturn] | None:
-    coroutine = _Coroutine(f, {}, s.executor())
+    coroutine = _coroutine(f, {}, s.executor(), deadline, priority)
     if s.add(coroutine):
         return coroutine.p
     return None
 
 
-def emit[T, TNext, TReturn](c: Coroutine[T, TNext, TReturn], v: T) -> Future[TNext]:
+@overload
+def emit[T, TNext, TReturn](c: Coroutine[T, TNext, TReturn], v: T) -> Future[TNext]: ...
+@overload
+def emit[T, TNext, TReturn](
+    c: GeneratorCoroutine[T, TNext, TReturn], v: T
+) -> _Suspend[Future[TNext]]: ...
+def emit[T, TNext, TReturn](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn], v: T
+) -> Future[TNext] | _Suspend[Future[TNext]]:
     p = Future[TNext]()
-    c.emit_and_wait(_Emit[T, TNext, TReturn](value=v, promise=p))
+    e = _Emit[T, TNext, TReturn](values=(v,), promises=(p,))
+    if _cooperative(c):
+        return c.suspend(e, lambda: p)
+
+    c.emit_and_wait(e)
     return p
 
 
+@overload
+def emit_many[T, TNext, TReturn](
+    c: Coroutine[T, TNext, TReturn], vs: Iterable[T]
+) -> list[Future[TNext]]: ...
+@overload
+def emit_many[T, TNext, TReturn](
+    c: GeneratorCoroutine[T, TNext, TReturn], vs: Iterable[T]
+) -> _Suspend[list[Future[TNext]]]: ...
+def emit_many[T, TNext, TReturn](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn], vs: Iterable[T]
+) -> list[Future[TNext]] | _Suspend[list[Future[TNext]]]:
+    values = tuple(vs)
+    ps = [Future[TNext]() for _ in values]
+    e = _Emit[T, TNext, TReturn](values=values, promises=tuple(ps))
+    if _cooperative(c):
+        return c.suspend(e, lambda: ps)
+
+    c.emit_and_wait(e)
+    return ps
+
+
+@overload
+def spawn[T, TNext, TReturn, R](
+    c: Coroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> Future[R]: ...
+@overload
 def spawn[T, TNext, TReturn, R](
-    c: Coroutine[T, TNext, TReturn], f: CoroutineFunc[T, TNext, R]
-) -> Future[R]:
-    coroutine = _Coroutine(f, c.resources(), c.executor())
-    c.emit_and_wait(_Emit[T, TNext, TReturn](spawn=coroutine))
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> _Suspend[Future[R]]: ...
+def spawn[T, TNext, TReturn, R](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> Future[R] | _Suspend[Future[R]]:
+    coroutine = _coroutine(f, c.resources(), c.executor(), c.deadline(), c.priority())
+    e = _Emit[T, TNext, TReturn](spawn=coroutine)
+    if _cooperative(c):
+        return c.suspend(e, lambda: coroutine.p)
+
+    c.emit_and_wait(e)
     return coroutine.p
 
 
-def wait[T, TNext, TReturn, P](c: Coroutine[T, TNext, TReturn], p: Future[P]) -> P:
+@overload
+def wait[T, TNext, TReturn, P](
+    c: Coroutine[T, TNext, TReturn], p: Future[P], timeout_ms: int | None = None
+) -> P: ...
+@overload
+def wait[T, TNext, TReturn, P](
+    c: GeneratorCoroutine[T, TNext, TReturn], p: Future[P], timeout_ms: int | None = None
+) -> _Suspend[P]: ...
+def wait[T, TNext, TReturn, P](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+    p: Future[P],
+    timeout_ms: int | None = None,
+) -> P | _Suspend[P]:
+    deadline = c.deadline()
+    if timeout_ms is not None:
+        expires = c.time() + timeout_ms
+        deadline = expires if deadline is None else min(deadline, expires)
+
+    e = _Emit[T, TNext, TReturn](wait=p, deadline=deadline)
+    if _cooperative(c):
+        return c.suspend(e, p.result)
+
     if not p.done():
-        c.emit_and_wait(_Emit[T, TNext, TReturn](wait=p))
+        c.emit_and_wait(e)
     assert p.done(), "promise must be completed"
     return p.result()
 
 
-def emit_and_wait[T, TNext, TReturn](c: Coroutine[T, TNext, TReturn], v: T) -> TNext:
+@overload
+def wait_all[T, TNext, TReturn, P](
+    c: Coroutine[T, TNext, TReturn], ps: Sequence[Future[P]], timeout_ms: int | None = None
+) -> list[P]: ...
+@overload
+def wait_all[T, TNext, TReturn, P](
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    ps: Sequence[Future[P]],
+    timeout_ms: int | None = None,
+) -> _Suspend[list[P]]: ...
+def wait_all[T, TNext, TReturn, P](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+    ps: Sequence[Future[P]],
+    timeout_ms: int | None = None,
+) -> list[P] | _Suspend[list[P]]:
+    return wait(c, _all(ps), timeout_ms)
+
+
+@overload
+def wait_any[T, TNext, TReturn, P](
+    c: Coroutine[T, TNext, TReturn], ps: Sequence[Future[P]], timeout_ms: int | None = None
+) -> Future[P]: ...
+@overload
+def wait_any[T, TNext, TReturn, P](
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    ps: Sequence[Future[P]],
+    timeout_ms: int | None = None,
+) -> _Suspend[Future[P]]: ...
+def wait_any[T, TNext, TReturn, P](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+    ps: Sequence[Future[P]],
+    timeout_ms: int | None = None,
+) -> Future[P] | _Suspend[Future[P]]:
+    return wait(c, _any(ps), timeout_ms)
+
+
+# the promise's done callbacks may run on any thread
+def _all[P](ps: Sequence[Future[P]]) -> Future[list[P]]:
+    p = Future[list[P]]()
+    remaining = len(ps)
+    lock = Lock()
+
+    def _(_: Future[P]) -> None:
+        nonlocal remaining
+        with lock:
+            remaining -= 1
+            if remaining > 0:
+                return
+
+        try:
+            p.set_result([q.result() for q in ps])
+        except Exception as e:
+            p.set_exception(e)
+
+    if remaining == 0:
+        p.set_result([])
+    for q in ps:
+        q.add_done_callback(_)
+    return p
+
+
+def _any[P](ps: Sequence[Future[P]]) -> Future[Future[P]]:
+    assert len(ps) > 0, "must wait on at least one promise"
+
+    p = Future[Future[P]]()
+    lock = Lock()
+
+    def _(q: Future[P]) -> None:
+        with lock:
+            if not p.done():
+                p.set_result(q)
+
+    for q in ps:
+        q.add_done_callback(_)
+    return p
+
+
+@overload
+def emit_and_wait[T, TNext, TReturn](c: Coroutine[T, TNext, TReturn], v: T) -> TNext: ...
+@overload
+def emit_and_wait[T, TNext, TReturn](
+    c: GeneratorCoroutine[T, TNext, TReturn], v: T
+) -> Awaitable[TNext]: ...
+def emit_and_wait[T, TNext, TReturn](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn], v: T
+) -> TNext | Awaitable[TNext]:
+    if _cooperative(c):
+        return _emit_and_wait(c, v)
     return wait(c, emit(c, v))
 
 
+@overload
+def spawn_and_wait[T, TNext, TReturn, R](
+    c: Coroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> R: ...
+@overload
 def spawn_and_wait[T, TNext, TReturn, R](
-    c: Coroutine[T, TNext, TReturn], f: CoroutineFunc[T, TNext, R]
-) -> R:
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> Awaitable[R]: ...
+def spawn_and_wait[T, TNext, TReturn, R](
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> R | Awaitable[R]:
+    if _cooperative(c):
+        return _spawn_and_wait(c, f)
     return wait(c, spawn(c, f))
+
+
+@types.coroutine
+def _emit_and_wait[T, TNext, TReturn](
+    c: GeneratorCoroutine[T, TNext, TReturn], v: T
+) -> Generator[Any, Any, TNext]:
+    p: Future[TNext] = yield emit(c, v)
+    return (yield wait(c, p))
+
+
+@types.coroutine
+def _spawn_and_wait[T, TNext, TReturn, R](
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    f: AnyCoroutineFunc[T, TNext, R],
+) -> Generator[Any, Any, R]:
+    p: Future[R] = yield spawn(c, f)
+    return (yield wait(c, p))
+
+
+@overload
+def map[T, TNext, TReturn, X, R](  # noqa: A001
+    c: Coroutine[T, TNext, TReturn],
+    f: Callable[[X], AnyCoroutineFunc[T, TNext, R]],
+    items: Iterable[X],
+    concurrency: int,
+) -> list[R]: ...
+@overload
+def map[T, TNext, TReturn, X, R](  # noqa: A001
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    f: Callable[[X], AnyCoroutineFunc[T, TNext, R]],
+    items: Iterable[X],
+    concurrency: int,
+) -> Awaitable[list[R]]: ...
+def map[T, TNext, TReturn, X, R](  # noqa: A001
+    c: Coroutine[T, TNext, TReturn] | GeneratorCoroutine[T, TNext, TReturn],
+    f: Callable[[X], AnyCoroutineFunc[T, TNext, R]],
+    items: Iterable[X],
+    concurrency: int,
+) -> list[R] | Awaitable[list[R]]:
+    assert concurrency > 0, "concurrency must be greater than zero"
+    if _cooperative(c):
+        return _map(c, f, items, concurrency)
+
+    ps: list[Future[R]] = []
+    running: list[Future[R]] = []
+    for item in items:
+        if len(running) == concurrency:
+            running.remove(wait_any(c, running))
+
+        p = spawn(c, f(item))
+        ps.append(p)
+        running.append(p)
+
+    return wait_all(c, ps)
+
+
+@types.coroutine
+def _map[T, TNext, TReturn, X, R](
+    c: GeneratorCoroutine[T, TNext, TReturn],
+    f: Callable[[X], AnyCoroutineFunc[T, TNext, R]],
+    items: Iterable[X],
+    concurrency: int,
+) -> Generator[Any, Any, list[R]]:
+    ps: list[Future[R]] = []
+    running: list[Future[R]] = []
+    for item in items:
+        if len(running) == concurrency:
+            done: Future[R] = yield wait_any(c, running)
+            running.remove(done)
+
+        p: Future[R] = yield spawn(c, f(item))
+        ps.append(p)
+        running.append(p)
+
+    return (yield wait_all(c, ps))
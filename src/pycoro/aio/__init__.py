@@ -1,7 +1,8 @@
 from __future__ import annotations
 
-from queue import Empty, Queue
-from threading import Event, Thread
+from collections import deque
+from queue import Queue
+from threading import Condition
 from typing import TYPE_CHECKING, Final, Protocol
 
 from pycoro.kernel import t_aio
@@ -13,6 +14,7 @@ if TYPE_CHECKING:
     from collections.abc import Callable
 
     from pycoro.aio.subsystem import Subsystem
+    from pycoro.kernel.wakeup import Notifier
 
 
 class AIO(Protocol):
@@ -21,7 +23,7 @@ class AIO(Protocol):
     def shutdown(self) -> None: ...
     @property
     def errors(self) -> Queue[Error] | None: ...
-    def signal(self, cancel: Event) -> Event: ...
+    def signal(self, wakeup: Notifier) -> None: ...
     def flush(self, time: int) -> None: ...
     def dispatch(
         self,
@@ -30,7 +32,10 @@ class AIO(Protocol):
     ) -> None: ...
     def enqueue_sqe(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> None: ...
     def enqueue_cqe(self, cqe: CQE[t_aio.Kind, t_aio.Kind]) -> None: ...
+    def enqueue_cqes(self, cqes: list[CQE[t_aio.Kind, t_aio.Kind]]) -> None: ...
+    def try_enqueue_cqes(self, cqes: list[CQE[t_aio.Kind, t_aio.Kind]]) -> int: ...
     def dequeue_cqe(self, n: int) -> list[CQE[t_aio.Kind, t_aio.Kind]]: ...
+    def depth(self) -> int: ...
 
 
 def new(size: int) -> _AIO:
@@ -39,8 +44,10 @@ def new(size: int) -> _AIO:
 
 class _AIO:
     def __init__(self, size: int) -> None:
-        self.cq: Final = Queue[CQE[t_aio.Kind, t_aio.Kind]](size)
-        self.buffer: CQE[t_aio.Kind, t_aio.Kind] | None = None
+        self.size: Final = size
+        self.cq: Final = deque[CQE[t_aio.Kind, t_aio.Kind]]()
+        self.cq_not_full: Final = Condition()
+        self.wakeup: Notifier | None = None
         self.subsystems: dict[str, Subsystem] = {}
         self.errors: Final = Queue[Error]()
 
@@ -77,46 +84,52 @@ class _AIO:
             sqe.callback(Error(StatusCode.STATUS_AIO_SUBMISSION_QUEUE_FULL))
 
     def enqueue_cqe(self, cqe: CQE[t_aio.Kind, t_aio.Kind]) -> None:
-        self.cq.put(cqe)
+        self.enqueue_cqes([cqe])
+
+    def enqueue_cqes(self, cqes: list[CQE[t_aio.Kind, t_aio.Kind]]) -> None:
+        with self.cq_not_full:
+            i = 0
+            while True:
+                n = min(len(cqes) - i, self.size - len(self.cq))
+                self.cq.extend(cqes[i : i + n])
+                i += n
+                if i == len(cqes):
+                    break
+
+                # Completions are never dropped, wait for the loop to make room.
+                self.notify()
+                _ = self.cq_not_full.wait()
+
+        self.notify()
+
+    def try_enqueue_cqes(self, cqes: list[CQE[t_aio.Kind, t_aio.Kind]]) -> int:
+        # takes what fits and leaves the rest to the caller, for callers that
+        # must not wait on the loop to make room, e.g. because they run on it
+        with self.cq_not_full:
+            n = min(len(cqes), self.size - len(self.cq))
+            self.cq.extend(cqes[:n])
+
+        if n > 0:
+            self.notify()
+        return n
 
     def dequeue_cqe(self, n: int) -> list[CQE[t_aio.Kind, t_aio.Kind]]:
-        cqes: list[CQE[t_aio.Kind, t_aio.Kind]] = []
+        with self.cq_not_full:
+            cqes = [self.cq.popleft() for _ in range(min(n, len(self.cq)))]
+            self.cq_not_full.notify(len(cqes))
 
-        if self.buffer is not None:
-            cqes.append(self.buffer)
-            self.buffer = None
+        return cqes
 
-        for _ in range(n - len(cqes)):
-            try:
-                sqe = self.cq.get_nowait()  # non-blocking
-            except Empty:
-                break
+    def depth(self) -> int:
+        return len(self.cq)
 
-            cqes.append(sqe)
+    def notify(self) -> None:
+        if self.wakeup is not None:
+            self.wakeup.notify()
 
-        return cqes
+    def signal(self, wakeup: Notifier) -> None:
+        self.wakeup = wakeup
 
-    def signal(self, cancel: Event) -> Event:
-        signal_event = Event()
-
-        # If buffer is already filled, signal immediately.
-        if self.buffer is not None:
-            signal_event.set()
-            return signal_event
-
-        def wait_for_signal() -> None:
-            while not cancel.is_set():
-                try:
-                    sqe = self.cq.get(timeout=0.1)
-                    assert self.buffer is None, "buffer must be None"
-                    self.buffer = sqe
-                    signal_event.set()
-                except Empty:
-                    continue
-                else:
-                    return
-            # Cancel triggered
-            signal_event.set()
-
-        Thread(target=wait_for_signal, daemon=True).start()
-        return signal_event
+        # If completions are already queued, signal immediately.
+        if len(self.cq) > 0:
+            wakeup.notify()
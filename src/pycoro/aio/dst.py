@@ -8,10 +8,10 @@ from pycoro.kernel.bus import CQE, SQE
 if TYPE_CHECKING:
     from collections.abc import Callable
     from random import Random
-    from threading import Event
 
     from pycoro.aio.subsystem import SubsystemDST
     from pycoro.kernel import t_aio
+    from pycoro.kernel.wakeup import Notifier
 
 
 def new(r: Random, p: float) -> _AIODst:
@@ -43,7 +43,7 @@ class _AIODst:
     def errors(self) -> None:
         return None
 
-    def signal(self, cancel: Event) -> Event:  # pyright: ignore[reportUnusedParameter]
+    def signal(self, wakeup: Notifier) -> None:  # pyright: ignore[reportUnusedParameter]
         raise NotImplementedError
 
     def flush(self, time: int) -> None:  # pyright: ignore[reportUnusedParameter]
@@ -100,7 +100,17 @@ class _AIODst:
     def enqueue_cqe(self, cqe: CQE[t_aio.Kind, t_aio.Kind]) -> None:
         self.cqes.append(cqe)
 
+    def enqueue_cqes(self, cqes: list[CQE[t_aio.Kind, t_aio.Kind]]) -> None:
+        self.cqes.extend(cqes)
+
+    def try_enqueue_cqes(self, cqes: list[CQE[t_aio.Kind, t_aio.Kind]]) -> int:
+        self.cqes.extend(cqes)
+        return len(cqes)
+
     def dequeue_cqe(self, n: int) -> list[CQE[t_aio.Kind, t_aio.Kind]]:
         cqes = self.cqes[: min(n, len(self.cqes))]
         self.cqes = self.cqes[min(n, len(self.cqes)) :]
         return cqes
+
+    def depth(self) -> int:
+        return len(self.cqes)
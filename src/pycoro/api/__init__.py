@@ -1,17 +1,24 @@
 from __future__ import annotations
 
-from queue import Empty, Full, Queue
-from threading import Event, Thread
-from typing import TYPE_CHECKING, Any, Final, Protocol
-
+import math
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from queue import Queue
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Final, Literal, Protocol
+
+from pycoro.api import ratelimit
 from pycoro.kernel import t_api
 from pycoro.kernel.bus import SQE
+from pycoro.kernel.ring import Ring
 from pycoro.kernel.t_api.error import Error
 from pycoro.kernel.t_api.status import StatusCode
 
 if TYPE_CHECKING:
     from pycoro.api.subsystem import Subsystem
     from pycoro.kernel.bus import CQE
+    from pycoro.kernel.wakeup import Notifier
 
 
 class API(Protocol):
@@ -19,10 +26,14 @@ class API(Protocol):
     def stop(self) -> None: ...
     def shutdown(self) -> None: ...
     def done(self) -> bool: ...
+    def depth(self) -> int: ...
     @property
     def errors(self) -> Queue[Error]: ...
-    def signal(self, cancel: Event) -> Event: ...
+    def signal(self, wakeup: Notifier) -> None: ...
     def enqueue_sqe(self, sqe: SQE[t_api.Request[Any], t_api.Response[Any]]) -> None: ...
+    def enqueue_sqes(
+        self, sqes: list[SQE[t_api.Request[Any], t_api.Response[Any]]], *, atomic: bool = ...
+    ) -> int: ...
     def dequeue_sqe(self, n: int) -> list[SQE[t_api.Request[Any], t_api.Response[Any]]]: ...
     def enqueue_cqe(self, cqe: CQE[t_api.Request[Any], t_api.Response[Any]]) -> None: ...
     def dequeue_cqe(
@@ -30,25 +41,61 @@ class API(Protocol):
     ) -> CQE[t_api.Request[Any], t_api.Response[Any]]: ...
 
 
-def new(size: int) -> _API:
-    return _API(size)
+@dataclass(frozen=True)
+class Config:
+    rate_weight: float = 0.2
+    codel_target: timedelta | None = None
+    codel_interval: timedelta = timedelta(milliseconds=100)
+    rate_limit: ratelimit.Config | None = None
+
+
+@dataclass
+class Shed:
+    rejected: int = 0
+    expired: int = 0
+    dropped: int = 0
+
+
+@dataclass
+class _CoDel:
+    first_above: int = 0
+    dropping: bool = False
+    drops: int = 0
+    drop_next: int = 0
+
+
+def new(size: int, config: Config | None = None) -> _API:
+    return _API(size, config or Config())
 
 
 class _API:
-    def __init__(self, size: int) -> None:
-        self.sq: Final = Queue[SQE[t_api.Request[Any], t_api.Response[Any]]](size)
-        self.buffer: SQE[t_api.Request[Any], t_api.Response[Any]] | None = None
+    def __init__(self, size: int, config: Config) -> None:
+        assert 0 < config.rate_weight <= 1, "rate weight must be in (0, 1]"
+
+        self.config: Final = config
+        self.sq: Final = Ring[tuple[int, SQE[t_api.Request[Any], t_api.Response[Any]]]](size)
         self.subsystems: list[Subsystem] = []
         self.completed: bool = False
         self.errors: Final = Queue[Error]()
         self.threads: list[Thread] = []
 
+        # submissions dequeued per second while the queue is backlogged,
+        # depth over rate estimates how long a new submission will wait
+        self.rate: float = 0.0
+        self.dequeued_at: int = 0
+        self.shed: Final[dict[str, Shed]] = {}
+        self.shed_lock: Final = Lock()
+        self.codel: Final = _CoDel()
+        self.limiter: Final = (
+            None if config.rate_limit is None else ratelimit.new(config.rate_limit)
+        )
+
     def add_subsystems(self, subsystem: Subsystem) -> None:
         self.subsystems.append(subsystem)
 
     def addr(self) -> str:
         for subsystem in self.subsystems:
-            if subsystem.kind() == "kind":
+            if subsystem.kind() == "http":
                 return subsystem.addr()
 
         return ""
@@ -64,7 +111,6 @@ class _API:
             subsystem.stop()
 
         self.sq.shutdown()
-        self.sq.join()
 
     def shutdown(self) -> None:
         self.completed = True
@@ -72,30 +118,11 @@ class _API:
     def done(self) -> bool:
         return self.completed and self.sq.qsize() == 0
 
-    def signal(self, cancel: Event) -> Event:
-        signal_event = Event()
-
-        # If buffer is already filled, signal immediately.
-        if self.buffer is not None:
-            signal_event.set()
-            return signal_event
-
-        def wait_for_signal() -> None:
-            while not cancel.is_set():
-                try:
-                    sqe = self.sq.get(timeout=0.1)
-                    assert self.buffer is None, "buffer must be None"
-                    self.buffer = sqe
-                    signal_event.set()
-                except Empty:
-                    continue
-                else:
-                    return
-            # Cancel triggered
-            signal_event.set()
+    def depth(self) -> int:
+        return self.sq.qsize()
 
-        Thread(target=wait_for_signal, daemon=True).start()
-        return signal_event
+    def signal(self, wakeup: Notifier) -> None:
+        self.sq.signal(wakeup)
 
     def enqueue_sqe(self, sqe: SQE[t_api.Request[Any], t_api.Response[Any]]) -> None:
         assert sqe.submission is not None, "submission must not be None"
@@ -104,35 +131,137 @@ class _API:
             sqe.callback(Error(StatusCode.STATUS_SYSTEM_SHUTTING_DOWN))
             return
 
+        err = self.admit(sqe, time.time() * 1000 + self.delay() * 1000)
+        if err is not None:
+            sqe.callback(err)
+            return
+
+        # Try to enqueue without blocking, the queue notifies the wakeup
+        if not self.sq.put_nowait((time.monotonic_ns(), sqe)):
+            sqe.callback(Error(StatusCode.STATUS_API_SUBMISSION_QUEUE_FULL))
+
+    def enqueue_sqes(
+        self, sqes: list[SQE[t_api.Request[Any], t_api.Response[Any]]], *, atomic: bool = False
+    ) -> int:
+        if self.completed:
+            for sqe in sqes:
+                sqe.callback(Error(StatusCode.STATUS_SYSTEM_SHUTTING_DOWN))
+            return 0
+
+        admitted: list[SQE[t_api.Request[Any], t_api.Response[Any]]] = []
+        eta = time.time() * 1000 + self.delay() * 1000
+        for sqe in sqes:
+            assert sqe.submission is not None, "submission must not be None"
+
+            err = self.admit(sqe, eta)
+            if err is None:
+                admitted.append(sqe)
+            else:
+                sqe.callback(err)
+
+        # the whole batch goes in under one acquisition of the queue lock,
+        # atomic batches go in whole or not at all
+        now = time.monotonic_ns()
+        n = self.sq.put_many([(now, sqe) for sqe in admitted], atomic=atomic)
+
+        for sqe in admitted[n:]:
+            sqe.callback(Error(StatusCode.STATUS_API_SUBMISSION_QUEUE_FULL))
+        return n
+
+    def admit(self, sqe: SQE[t_api.Request[Any], t_api.Response[Any]], eta: float) -> Error | None:
         try:
             sqe.submission.validate()
         except Exception as err:
-            sqe.callback(Error(StatusCode.STATUS_FIELD_VALIDATION_ERROR, err))
-            return
+            return Error(StatusCode.STATUS_FIELD_VALIDATION_ERROR, err)
 
-        # Try to enqueue without blocking
-        try:
-            self.sq.put_nowait(sqe)
-        except Full:
-            sqe.callback(Error(StatusCode.STATUS_API_SUBMISSION_QUEUE_FULL))
+        # a tenant over its rate never takes room in the queue from the others
+        if self.limiter is not None and not self.limiter.allow(
+            self.limiter.config.key(sqe.submission.payload)
+        ):
+            return Error(StatusCode.STATUS_API_RATE_LIMITED)
+
+        # reject early what would still be queued when its deadline passes
+        deadline = sqe.submission.deadline
+        if deadline is not None and eta >= deadline:
+            self.count(sqe.submission.kind(), "rejected")
+            return Error(StatusCode.STATUS_REQUEST_TIMEOUT)
+
+        return None
 
     def dequeue_sqe(self, n: int) -> list[SQE[t_api.Request[Any], t_api.Response[Any]]]:
         sqes: list[SQE[t_api.Request[Any], t_api.Response[Any]]] = []
+        now = time.monotonic_ns()
+        wall = time.time() * 1000
 
-        if self.buffer is not None:
-            sqes.append(self.buffer)
-            self.buffer = None
-
-        for _ in range(n - len(sqes)):
-            try:
-                sqe = self.sq.get_nowait()  # non-blocking
-            except Empty:
+        dequeued = 0
+        while len(sqes) < n:
+            batch = self.sq.pop(n - len(sqes))
+            if len(batch) == 0:
                 break
+            dequeued += len(batch)
+
+            for enqueued, sqe in batch:
+                # nobody is waiting on these anymore
+                deadline = sqe.submission.deadline
+                if deadline is not None and deadline <= wall:
+                    self.count(sqe.submission.kind(), "expired")
+                    sqe.callback(Error(StatusCode.STATUS_REQUEST_TIMEOUT))
+                    continue
 
-            sqes.append(sqe)
+                if self.drop(now - enqueued, now):
+                    self.count(sqe.submission.kind(), "dropped")
+                    sqe.callback(Error(StatusCode.STATUS_API_OVERLOADED))
+                    continue
+
+                sqes.append(sqe)
+
+        # only a backlogged queue measures how fast submissions are taken
+        if dequeued > 0 and self.sq.qsize() > 0 and self.dequeued_at > 0:
+            rate = dequeued / max(now - self.dequeued_at, 1) * 1_000_000_000
+            self.rate += self.config.rate_weight * (rate - self.rate)
+        self.dequeued_at = now
 
         return sqes
 
+    def delay(self) -> float:
+        return 0.0 if self.rate == 0 else self.sq.qsize() / self.rate
+
+    def count(self, kind: str, reason: Literal["rejected", "expired", "dropped"]) -> None:
+        with self.shed_lock:
+            shed = self.shed.setdefault(kind, Shed())
+            setattr(shed, reason, getattr(shed, reason) + 1)
+
+    def drop(self, sojourn: int, now: int) -> bool:
+        if self.config.codel_target is None:
+            return False
+
+        # codel, once submissions have waited longer than the target for a
+        # whole interval drop them, more often the longer that lasts
+        target = int(self.config.codel_target.total_seconds() * 1_000_000_000)
+        interval = int(self.config.codel_interval.total_seconds() * 1_000_000_000)
+        codel = self.codel
+
+        if sojourn < target:
+            codel.first_above = 0
+            codel.dropping = False
+            return False
+
+        if codel.first_above == 0:
+            codel.first_above = now + interval
+        if now < codel.first_above:
+            return False
+
+        if not codel.dropping:
+            codel.dropping = True
+            codel.drops = 0
+            codel.drop_next = now
+        if now < codel.drop_next:
+            return False
+
+        codel.drops += 1
+        codel.drop_next += int(interval / math.sqrt(codel.drops))
+        return True
+
     def enqueue_cqe(self, cqe: CQE[t_api.Request[Any], t_api.Response[Any]]) -> None:
         return cqe.invoke()
 
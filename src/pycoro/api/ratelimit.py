@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Final, Literal
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+
+
+type Algorithm = Literal["token_bucket", "gcra"]
+
+
+@dataclass(frozen=True)
+class Config:
+    key: Callable[[Any], Hashable]
+    rate: float
+    burst: int = 1
+    algorithm: Algorithm = "gcra"
+    max_keys: int = 100_000
+
+
+@dataclass
+class Stats:
+    allowed: int = 0
+    rejected: int = 0
+    evicted: int = 0
+
+
+@dataclass
+class _Tenant:
+    # nanoseconds of credit for token bucket, theoretical arrival time for
+    # gcra, integers so that a burst is exact
+    value: int
+    updated: int
+    rejected: int = 0
+
+
+def new(config: Config) -> _Limiter:
+    return _Limiter(config)
+
+
+class _Limiter:
+    def __init__(self, config: Config) -> None:
+        assert config.rate > 0, "rate must be greater than zero"
+        assert config.burst > 0, "burst must be greater than zero"
+        assert config.max_keys > 0, "max keys must be greater than zero"
+
+        self.config: Final = config
+        self.stats: Final = Stats()
+        self.interval: Final = round(1_000_000_000 / config.rate)
+        self.lock: Final = Lock()
+
+        # least recently seen first, a tenant idle long enough to be back to
+        # a full burst is the same as one that is not in the table at all
+        self.tenants: Final[OrderedDict[Hashable, _Tenant]] = OrderedDict()
+
+    def allow(self, key: Hashable, now: int | None = None) -> bool:
+        if now is None:
+            now = time.monotonic_ns()
+
+        with self.lock:
+            self._expire(now)
+
+            tenant = self.tenants.get(key)
+            if tenant is None:
+                tenant = self._fresh(now)
+                self.tenants[key] = tenant
+                if len(self.tenants) > self.config.max_keys:
+                    _ = self.tenants.popitem(last=False)
+                    self.stats.evicted += 1
+            else:
+                self.tenants.move_to_end(key)
+
+            match self.config.algorithm:
+                case "token_bucket":
+                    allowed = self._token_bucket(tenant, now)
+                case "gcra":
+                    allowed = self._gcra(tenant, now)
+
+            if allowed:
+                self.stats.allowed += 1
+            else:
+                tenant.rejected += 1
+                self.stats.rejected += 1
+            return allowed
+
+    def rejected(self, key: Hashable) -> int:
+        with self.lock:
+            tenant = self.tenants.get(key)
+            return 0 if tenant is None else tenant.rejected
+
+    def size(self) -> int:
+        return len(self.tenants)
+
+    def _fresh(self, now: int) -> _Tenant:
+        match self.config.algorithm:
+            case "token_bucket":
+                return _Tenant(self.interval * self.config.burst, now)
+            case "gcra":
+                return _Tenant(now, now)
+
+    def _token_bucket(self, tenant: _Tenant, now: int) -> bool:
+        tenant.value = min(self.interval * self.config.burst, tenant.value + now - tenant.updated)
+        tenant.updated = now
+        if tenant.value < self.interval:
+            return False
+
+        tenant.value -= self.interval
+        return True
+
+    def _gcra(self, tenant: _Tenant, now: int) -> bool:
+        tat = max(tenant.value, now)
+        if tat - now > self.interval * (self.config.burst - 1):
+            return False
+
+        tenant.value = tat + self.interval
+        tenant.updated = now
+        return True
+
+    def _full(self, tenant: _Tenant, now: int) -> bool:
+        match self.config.algorithm:
+            case "token_bucket":
+                return tenant.value + now - tenant.updated >= self.interval * self.config.burst
+            case "gcra":
+                return tenant.value <= now
+
+    def _expire(self, now: int) -> None:
+        # a couple of the least recently seen per call keeps the table from
+        # holding on to idle tenants without ever scanning all of it
+        for _ in range(2):
+            if len(self.tenants) == 0:
+                return
+
+            key, tenant = next(iter(self.tenants.items()))
+            if not self._full(tenant, now):
+                return
+            del self.tenants[key]
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from queue import Full, Queue, ShutDown
+from queue import Queue, ShutDown
 from threading import Thread
 from typing import TYPE_CHECKING, Final, Literal
 
 from pycoro.kernel import t_aio
 from pycoro.kernel.bus import CQE, SQE
+from pycoro.kernel.ring import Ring
 
 if TYPE_CHECKING:
     from pycoro.aio import AIO
@@ -43,7 +44,7 @@ class _Echo:
     def __init__(self, aio: AIO, config: Config) -> None:
         self.config: Final = config
         self.aio: Final = aio
-        self.sq: Final = Queue[SQE[t_aio.Kind, t_aio.Kind]](config.size)
+        self.sq: Final = Ring[SQE[t_aio.Kind, t_aio.Kind]](config.size)
         self.workers: list[Thread] = [
             Thread(target=self._worker, daemon=True) for _ in range(config.workers)
         ]
@@ -61,15 +62,9 @@ class _Echo:
             w.join()
 
         self.workers.clear()
-        self.sq.join()
 
     def enqueue(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> bool:
-        try:
-            self.sq.put_nowait(sqe)
-        except Full:
-            return False
-        else:
-            return True
+        return self.sq.put_nowait(sqe)
 
     def flush(self, time: int) -> None:  # pyright: ignore[reportUnusedParameter]
         return None
@@ -89,9 +84,16 @@ class _Echo:
     def _worker(self) -> None:
         while True:
             try:
-                sqe = self.sq.get()
+                sqes = [self.sq.get()]
             except ShutDown:
                 break
-            assert sqe.submission.kind() == self.kind()
-            self.aio.enqueue_cqe(self._process(sqe))
-            self.sq.task_done()
+
+            # drain whatever else is queued, up to a batch
+            sqes.extend(self.sq.pop(self.config.batch_size - 1))
+
+            cqes: list[CQE[t_aio.Kind, t_aio.Kind]] = []
+            for sqe in sqes:
+                assert sqe.submission.kind() == self.kind()
+                cqes.append(self._process(sqe))
+
+            self.aio.enqueue_cqes(cqes)
@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+import concurrent.futures
+import multiprocessing
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass
-from queue import Full, Queue, ShutDown
-from threading import Thread
+from functools import partial
+from queue import Queue, ShutDown
+from threading import Semaphore, Thread
 from typing import TYPE_CHECKING, Any, Final, Literal
 
 from pycoro.kernel import t_aio
 from pycoro.kernel.bus import CQE, SQE
+from pycoro.kernel.ring import Ring
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.status import StatusCode
 
 if TYPE_CHECKING:
     from collections.abc import Callable
+    from concurrent.futures import Future
 
     from pycoro.aio import AIO
-    from pycoro.kernel.t_api.error import Error
+
+
+type Mode = Literal["thread", "process", "interpreter", "parallel"]
 
 
 class _Kind:
@@ -22,7 +33,8 @@ class _Kind:
 
 @dataclass(frozen=True)
 class FunctionSubmission(_Kind):
-    fn: Callable[[], Any]
+    fn: Callable[..., Any]
+    args: tuple[Any, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -33,7 +45,9 @@ class FunctionCompletion(_Kind):
 @dataclass(frozen=True)
 class Config:
     size: int = 100
+    batch_size: int = 100
     workers: int = 1
+    mode: Mode = "thread"
 
 
 def new(aio: AIO, config: Config) -> _Function:
@@ -44,15 +58,35 @@ class _Function:
     def __init__(self, aio: AIO, config: Config) -> None:
         self.config: Final = config
         self.aio: Final = aio
-        self.sq: Final = Queue[SQE[t_aio.Kind, t_aio.Kind]](config.size)
+        self.sq: Final = Ring[SQE[t_aio.Kind, t_aio.Kind]](config.size)
         self.workers: list[Thread] = [
             Thread(target=self._worker, daemon=True) for _ in range(config.workers)
         ]
+        self.mode: Final = _resolve(config.mode)
+        self.executor: Executor | None = None
+
+        # calls handed to the executor and not completed yet, bounded like
+        # the submission queue
+        self.slots: Final = Semaphore(config.size)
 
     def kind(self) -> Literal["function"]:
         return "function"
 
     def start(self, errors: Queue[Error] | None) -> None:  # pyright: ignore[reportUnusedParameter]
+        match self.mode:
+            case "process":
+                # the subsystem runs next to other threads, so avoid fork
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.config.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            case "interpreter":
+                pool = _interpreter_pool()
+                assert pool is not None, "interpreter mode requires an interpreter pool"
+                self.executor = pool(max_workers=self.config.workers)
+            case _:
+                # without the gil "parallel" workers already run in parallel
+                pass
+
         for w in self.workers:
             w.start()
 
@@ -62,15 +96,12 @@ class _Function:
             w.join()
 
         self.workers.clear()
-        self.sq.join()
+
+        if self.executor is not None:
+            self.executor.shutdown()
 
     def enqueue(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> bool:
-        try:
-            self.sq.put_nowait(sqe)
-        except Full:
-            return False
-        else:
-            return True
+        return self.sq.put_nowait(sqe)
 
     def flush(self, time: int) -> None:  # pyright: ignore[reportUnusedParameter]
         return None
@@ -78,11 +109,28 @@ class _Function:
     def _process(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> CQE[t_aio.Kind, t_aio.Kind]:
         assert isinstance(sqe.submission, FunctionSubmission)
 
-        result: Any | Exception
+        return CQE(
+            sqe.callback,
+            FunctionCompletion(_call(sqe.submission.fn, sqe.submission.args)),
+        )
+
+    def _submit(
+        self, executor: Executor, sqe: SQE[t_aio.Kind, t_aio.Kind]
+    ) -> Future[Any | Exception]:
+        assert isinstance(sqe.submission, FunctionSubmission)
+        return executor.submit(_call, sqe.submission.fn, sqe.submission.args)
+
+    def _complete(
+        self, sqe: SQE[t_aio.Kind, t_aio.Kind], future: Future[Any | Exception]
+    ) -> CQE[t_aio.Kind, t_aio.Kind]:
+        # exceptions raised by the function are part of its completion, so an
+        # exception here means the call could not be shipped to or from the
+        # executor, e.g. it could not be pickled
         try:
-            result = sqe.submission.fn()
+            result = future.result()
         except Exception as e:
-            result = e
+            return CQE(sqe.callback, Error(StatusCode.STATUS_AIO_FUNCTION_ERROR, e))
+
         return CQE(
             sqe.callback,
             FunctionCompletion(result),
@@ -95,9 +143,50 @@ class _Function:
     def _worker(self) -> None:
         while True:
             try:
-                sqe = self.sq.get()
+                sqes = [self.sq.get()]
             except ShutDown:
                 break
-            assert sqe.submission.kind() == self.kind()
-            self.aio.enqueue_cqe(self._process(sqe))
-            self.sq.task_done()
+
+            # drain whatever else is queued, up to a batch
+            sqes.extend(self.sq.pop(self.config.batch_size - 1))
+
+            if self.executor is None:
+                cqes: list[CQE[t_aio.Kind, t_aio.Kind]] = []
+                for sqe in sqes:
+                    assert sqe.submission.kind() == self.kind()
+                    cqes.append(self._process(sqe))
+                self.aio.enqueue_cqes(cqes)
+                continue
+
+            # each call completes on its own, a slow one does not hold back
+            # the rest of the batch nor this worker
+            for sqe in sqes:
+                _ = self.slots.acquire()
+                future = self._submit(self.executor, sqe)
+                future.add_done_callback(partial(self._done, sqe))
+
+    def _done(self, sqe: SQE[t_aio.Kind, t_aio.Kind], future: Future[Any | Exception]) -> None:
+        self.slots.release()
+        self.aio.enqueue_cqe(self._complete(sqe, future))
+
+
+def _resolve(mode: Mode) -> Mode:
+    match mode:
+        case "interpreter" if _interpreter_pool() is None:
+            return "thread"
+        case "parallel" if sys._is_gil_enabled():  # noqa: SLF001  # pyright: ignore[reportPrivateUsage]
+            return "thread"
+        case _:
+            return mode
+
+
+def _interpreter_pool() -> Callable[..., Executor] | None:
+    # added in 3.14
+    return getattr(concurrent.futures, "InterpreterPoolExecutor", None)
+
+
+def _call(fn: Callable[..., Any], args: tuple[Any, ...]) -> Any | Exception:
+    try:
+        return fn(*args)
+    except Exception as e:
+        return e
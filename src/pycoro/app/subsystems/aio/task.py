@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from functools import partial
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Final, Literal
+
+from pycoro.kernel.bus import CQE
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable
+    from queue import Queue
+
+    from pycoro.aio import AIO
+    from pycoro.kernel import t_aio
+    from pycoro.kernel.bus import SQE
+
+
+class _Kind:
+    def kind(self) -> Literal["task"]:
+        return "task"
+
+
+@dataclass(frozen=True)
+class TaskSubmission(_Kind):
+    fn: Callable[..., Awaitable[Any]]
+    args: tuple[Any, ...] = ()
+
+
+@dataclass(frozen=True)
+class TaskCompletion(_Kind):
+    result: Any | Exception
+
+
+@dataclass(frozen=True)
+class Config:
+    size: int = 100
+
+
+def new(aio: AIO, config: Config, loop: asyncio.AbstractEventLoop | None = None) -> _Task:
+    return _Task(aio, config, loop)
+
+
+class _Task:
+    def __init__(self, aio: AIO, config: Config, loop: asyncio.AbstractEventLoop | None) -> None:
+        self.config: Final = config
+        self.aio: Final = aio
+
+        # without a loop the subsystem runs one on its own thread, with one it
+        # shares it, typically with a system running in asyncio host mode
+        self.loop: asyncio.AbstractEventLoop | None = loop
+        self.thread: Thread | None = None
+        self.tasks: Final = set[asyncio.Task[None]]()
+        self.inflight: int = 0
+        self.lock: Final = Lock()
+
+        # on a shared loop completions that do not fit in the aio completion
+        # queue wait here, the system drains the queue on this same thread
+        # and flushes them back in on every tick
+        self.overflow: Final[deque[CQE[t_aio.Kind, t_aio.Kind]]] = deque()
+
+    def kind(self) -> Literal["task"]:
+        return "task"
+
+    def start(self, errors: Queue[Error] | None) -> None:  # pyright: ignore[reportUnusedParameter]
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = Thread(target=self.loop.run_forever, daemon=True)
+            self.thread.start()
+
+    def stop(self) -> None:
+        # a shared loop belongs to whoever passed it in, so do its tasks
+        if self.loop is None or self.thread is None:
+            return
+
+        loop = self.loop
+        asyncio.run_coroutine_threadsafe(self._drain(), loop).result()
+        _ = loop.call_soon_threadsafe(loop.stop)
+        self.thread.join()
+        loop.close()
+
+        self.loop = None
+        self.thread = None
+
+    def enqueue(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> bool:
+        assert self.loop is not None, "subsystem must be started"
+
+        with self.lock:
+            if self.inflight >= self.config.size:
+                return False
+            self.inflight += 1
+
+        try:
+            _ = self.loop.call_soon_threadsafe(self._spawn, sqe)
+        except RuntimeError:
+            # the loop is closed
+            with self.lock:
+                self.inflight -= 1
+            return False
+        else:
+            return True
+
+    def flush(self, time: int) -> None:  # pyright: ignore[reportUnusedParameter]
+        if len(self.overflow) == 0:
+            return
+
+        n = self.aio.try_enqueue_cqes(list(self.overflow))
+        for _ in range(n):
+            _ = self.overflow.popleft()
+
+    def process(self, sqes: list[SQE[t_aio.Kind, t_aio.Kind]]) -> list[CQE[t_aio.Kind, t_aio.Kind]]:
+        cqes: list[CQE[t_aio.Kind, t_aio.Kind]] = []
+        for sqe in sqes:
+            assert isinstance(sqe.submission, TaskSubmission)
+            result = asyncio.run(_call(sqe.submission.fn, sqe.submission.args))
+            cqes.append(CQE(sqe.callback, TaskCompletion(result)))
+        return cqes
+
+    def _spawn(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> None:
+        assert self.loop is not None
+
+        # the loop only keeps weak references to its tasks
+        task = self.loop.create_task(self._run(sqe))
+        self.tasks.add(task)
+        task.add_done_callback(partial(self._done, sqe))
+
+    async def _run(self, sqe: SQE[t_aio.Kind, t_aio.Kind]) -> None:
+        assert isinstance(sqe.submission, TaskSubmission)
+
+        result = await _call(sqe.submission.fn, sqe.submission.args)
+        self._complete(CQE(sqe.callback, TaskCompletion(result)))
+
+    def _done(self, sqe: SQE[t_aio.Kind, t_aio.Kind], task: asyncio.Task[None]) -> None:
+        self.tasks.discard(task)
+        with self.lock:
+            self.inflight -= 1
+
+        # a task cancelled before or while it ran still owes the coroutine
+        # waiting on it a completion
+        if task.cancelled():
+            self._complete(CQE(sqe.callback, Error(StatusCode.STATUS_AIO_TASK_ERROR)))
+
+    def _complete(self, cqe: CQE[t_aio.Kind, t_aio.Kind]) -> None:
+        if self.thread is not None:
+            self.aio.enqueue_cqe(cqe)
+            return
+
+        # never wait for room on a shared loop, the next tick makes it
+        if len(self.overflow) > 0 or self.aio.try_enqueue_cqes([cqe]) == 0:
+            self.overflow.append(cqe)
+
+    async def _drain(self) -> None:
+        _ = await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+async def _call(fn: Callable[..., Awaitable[Any]], args: tuple[Any, ...]) -> Any | Exception:
+    try:
+        return await fn(*args)
+    except Exception as e:
+        return e
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import json
+import threading
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any, Final, Literal
+
+from pycoro.kernel import t_api
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from pycoro.api import API
+    from pycoro.kernel.t_api.request import RequestPayload
+
+
+type Result = t_api.Response[Any] | Exception
+
+
+@dataclass(frozen=True)
+class Config:
+    host: str = "127.0.0.1"
+    port: int = 0
+    max_inflight: int = 16
+    max_header_size: int = 64 * 1024
+    max_body_size: int = 1024 * 1024
+    # a request that has not been answered by then is answered with a 504,
+    # whether its handler is parked in pycoro or stuck in its own code
+    deadline: timedelta | None = timedelta(seconds=30)
+
+
+@dataclass(frozen=True)
+class _Reply:
+    status: int
+    body: bytes
+
+
+def new(api: API, config: Config) -> _Http:
+    return _Http(api, config)
+
+
+class _Http:
+    def __init__(self, api: API, config: Config) -> None:
+        assert config.max_inflight > 0, "max inflight must be greater than zero"
+
+        self.config: Final = config
+        self.api: Final = api
+        self.routes: Final[dict[tuple[str, str], Callable[[bytes], RequestPayload]]] = {}
+        self.started: Final = threading.Event()
+        self.lock: Final = threading.Lock()
+        self.closed: bool = False
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.stopping: asyncio.Event | None = None
+        self.address: str = ""
+
+    def kind(self) -> Literal["http"]:
+        return "http"
+
+    def addr(self) -> str:
+        return self.address
+
+    def route(self, method: str, path: str, decode: Callable[[bytes], RequestPayload]) -> None:
+        self.routes[(method, path)] = decode
+
+    def start(self) -> None:
+        try:
+            asyncio.run(self._serve())
+        finally:
+            # a server that failed to bind is done starting all the same
+            self.started.set()
+
+    def stop(self) -> None:
+        # a server that is not serving yet sees closed once it is, one that
+        # never started or failed to bind has nothing to stop
+        with self.lock:
+            self.closed = True
+            loop, stopping = self.loop, self.stopping
+        if loop is None or stopping is None:
+            return
+
+        try:
+            _ = loop.call_soon_threadsafe(stopping.set)
+        except RuntimeError:
+            # the loop is already closed
+            return
+
+    async def _serve(self) -> None:
+        server = await asyncio.start_server(
+            self._connection, self.config.host, self.config.port, limit=self.config.max_header_size
+        )
+        host, port = server.sockets[0].getsockname()[:2]
+        self.address = f"{host}:{port}"
+
+        stopping = asyncio.Event()
+        with self.lock:
+            if self.closed:
+                stopping.set()
+            self.loop, self.stopping = asyncio.get_running_loop(), stopping
+        self.started.set()
+
+        async with server:
+            _ = await stopping.wait()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        # pipelined requests are submitted as they are read and answered in
+        # order, the bounded queue stops reading once max inflight are pending
+        inflight = asyncio.Queue[tuple[asyncio.Future[_Reply], bool] | None](
+            self.config.max_inflight
+        )
+        respond = asyncio.create_task(self._respond(writer, inflight))
+
+        try:
+            while True:
+                method, path, keep_alive, body = await self._read(reader)
+                await inflight.put((self._submit(method, path, body), keep_alive))
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        except ValueError as e:
+            await inflight.put(
+                (self._reply(Error(StatusCode.STATUS_FIELD_VALIDATION_ERROR, e)), False)
+            )
+        finally:
+            await inflight.put(None)
+            await respond
+
+    async def _read(self, reader: asyncio.StreamReader) -> tuple[str, str, bool, bytes]:
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+
+        request_line = lines[0].split(" ")
+        if len(request_line) != 3:  # noqa: PLR2004
+            msg = "malformed request line"
+            raise ValueError(msg)
+        method, path, version = request_line
+
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if line == "":
+                continue
+            name, sep, value = line.partition(":")
+            if sep == "":
+                msg = "malformed header"
+                raise ValueError(msg)
+            headers[name.strip().lower()] = value.strip()
+
+        if "transfer-encoding" in headers:
+            msg = "transfer encoding is not supported"
+            raise ValueError(msg)
+
+        length = int(headers.get("content-length", "0"))
+        if length < 0 or length > self.config.max_body_size:
+            msg = "invalid content length"
+            raise ValueError(msg)
+        body = await reader.readexactly(length)
+
+        # keep alive is the default from http/1.1 on
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+        return method, path, keep_alive, body
+
+    def _submit(self, method: str, path: str, body: bytes) -> asyncio.Future[_Reply]:
+        decode = self.routes.get((method, path))
+        if decode is None:
+            return self._reply(_Reply(HTTPStatus.NOT_FOUND, b""))
+
+        try:
+            payload = decode(body)
+        except Exception as e:
+            return self._reply(Error(StatusCode.STATUS_FIELD_VALIDATION_ERROR, e))
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        # the callback runs on whichever thread completes the request
+        def callback(res: Result) -> None:
+            try:
+                _ = loop.call_soon_threadsafe(_resolve, future, _encode(res))
+            except RuntimeError:
+                # the server is gone, so is the connection
+                return
+
+        deadline = None
+        if self.config.deadline is not None:
+            deadline = int(time.time() * 1000 + self.config.deadline.total_seconds() * 1000)
+
+            # the system only enforces the deadline while the handler waits on
+            # pycoro, the server enforces it regardless so the pipeline moves on
+            timeout = loop.call_later(
+                self.config.deadline.total_seconds(),
+                _resolve,
+                future,
+                _encode(Error(StatusCode.STATUS_REQUEST_TIMEOUT)),
+            )
+            future.add_done_callback(lambda _: timeout.cancel())
+
+        self.api.enqueue_sqe(
+            SQE[t_api.Request[Any], t_api.Response[Any]](
+                submission=t_api.Request(payload, deadline), callback=callback
+            )
+        )
+        return future
+
+    def _reply(self, res: Result | _Reply) -> asyncio.Future[_Reply]:
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(res if isinstance(res, _Reply) else _encode(res))
+        return future
+
+    async def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        inflight: asyncio.Queue[tuple[asyncio.Future[_Reply], bool] | None],
+    ) -> None:
+        try:
+            while (item := await inflight.get()) is not None:
+                future, keep_alive = item
+                reply = await future
+
+                try:
+                    phrase = HTTPStatus(reply.status).phrase
+                except ValueError:
+                    phrase = ""
+
+                head = "\r\n".join(
+                    (
+                        f"HTTP/1.1 {reply.status} {phrase}",
+                        "Content-Type: application/json",
+                        f"Content-Length: {len(reply.body)}",
+                        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+                        "\r\n",
+                    )
+                )
+                writer.write(head.encode("latin-1") + reply.body)
+
+                # only wait for the socket once nothing else is ready to go
+                if inflight.empty():
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def _resolve(future: asyncio.Future[_Reply], reply: _Reply) -> None:
+    if not future.done():
+        future.set_result(reply)
+
+
+def _encode(res: Result) -> _Reply:
+    # runs inside sqe callbacks, some of them on the system loop thread, a
+    # response that cannot be serialized is the server's fault, not the loop's
+    try:
+        return _serialize(res)
+    except (TypeError, ValueError):
+        return _Reply(HTTPStatus.INTERNAL_SERVER_ERROR, b"")
+
+
+def _serialize(res: Result) -> _Reply:
+    # status codes are http status codes times a hundred
+    match res:
+        case Error():
+            return _Reply(res.code // 100, json.dumps({"error": str(res.code)}).encode())
+        case Exception():
+            return _Reply(HTTPStatus.INTERNAL_SERVER_ERROR, b"")
+        case _:
+            payload = res.payload
+            if dataclasses.is_dataclass(payload) and not isinstance(payload, type):
+                return _Reply(res.status // 100, json.dumps(dataclasses.asdict(payload)).encode())
+            return _Reply(res.status // 100, json.dumps(payload).encode())
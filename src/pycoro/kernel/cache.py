@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Final, Literal, Protocol
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+
+    from pycoro.kernel.t_api import Response
+
+
+type Eviction = Literal["lru", "lfu"]
+
+
+class Cache(Protocol):
+    @property
+    def config(self) -> Config: ...
+    @property
+    def stats(self) -> Stats: ...
+    def get(self, key: Hashable, time: int) -> Response[Any] | None: ...
+    def put(self, key: Hashable, res: Response[Any], time: int) -> None: ...
+    def invalidate(self, key: Hashable) -> bool: ...
+    def size(self) -> int: ...
+
+
+@dataclass(frozen=True)
+class Config:
+    key: Callable[[Any], Hashable]
+    ttl: int
+    max_entries: int | None = None
+    max_bytes: int | None = None
+    eviction: Eviction = "lru"
+    # only the caller knows how big a payload is, sys.getsizeof of a
+    # response is the same whatever it carries
+    sizeof: Callable[[Response[Any]], int] | None = None
+
+
+@dataclass
+class Stats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+@dataclass(eq=False)
+class _Entry:
+    res: Response[Any]
+    expires: int
+    size: int
+    uses: int = 1
+
+
+def new(config: Config) -> _Cache:
+    return _Cache(config)
+
+
+class _Cache:
+    def __init__(self, config: Config) -> None:
+        assert config.ttl > 0, "ttl must be greater than zero"
+        assert config.max_entries is None or config.max_entries > 0, (
+            "max entries must be greater than zero"
+        )
+        assert config.max_bytes is None or config.max_bytes > 0, (
+            "max bytes must be greater than zero"
+        )
+        assert config.max_bytes is None or config.sizeof is not None, "max bytes requires sizeof"
+
+        self.config: Final = config
+        self.stats: Final = Stats()
+        self.entries: Final[dict[Hashable, _Entry]] = {}
+        self.bytes: int = 0
+        self.lock: Final = Lock()
+
+        # keys ordered from least to most recently used, lru keeps them all in
+        # one bucket and lfu in one bucket per use count, the victim is always
+        # the first key of the lowest bucket
+        self.buckets: Final[dict[int, OrderedDict[Hashable, None]]] = {}
+
+    def get(self, key: Hashable, time: int) -> Response[Any] | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            if entry.expires <= time:
+                self._remove(key, entry)
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            self._touch(key, entry)
+            self.stats.hits += 1
+            return entry.res
+
+    def put(self, key: Hashable, res: Response[Any], time: int) -> None:
+        size = 0 if self.config.sizeof is None else self.config.sizeof(res)
+        if self.config.max_bytes is not None and size > self.config.max_bytes:
+            return
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self._remove(key, entry)
+
+            # make room first, a new entry has the fewest uses of all
+            while len(self.entries) > 0 and self._full(size):
+                bucket = self.buckets[min(self.buckets)]
+                victim = next(iter(bucket))
+                self._remove(victim, self.entries[victim])
+                self.stats.evictions += 1
+
+            entry = _Entry(res, time + self.config.ttl, size)
+            self.entries[key] = entry
+            self.bytes += size
+            self.buckets.setdefault(self._bucket(entry), OrderedDict())[key] = None
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False
+
+            self._remove(key, entry)
+            self.stats.invalidations += 1
+            return True
+
+    def size(self) -> int:
+        return len(self.entries)
+
+    def _full(self, size: int) -> bool:
+        return (
+            self.config.max_entries is not None and len(self.entries) >= self.config.max_entries
+        ) or (self.config.max_bytes is not None and self.bytes + size > self.config.max_bytes)
+
+    def _bucket(self, entry: _Entry) -> int:
+        return 0 if self.config.eviction == "lru" else entry.uses
+
+    def _touch(self, key: Hashable, entry: _Entry) -> None:
+        if self.config.eviction == "lru":
+            self.buckets[0].move_to_end(key)
+            return
+
+        self._unlink(key, entry)
+        entry.uses += 1
+        self.buckets.setdefault(entry.uses, OrderedDict())[key] = None
+
+    def _remove(self, key: Hashable, entry: _Entry) -> None:
+        self._unlink(key, entry)
+        del self.entries[key]
+        self.bytes -= entry.size
+
+    def _unlink(self, key: Hashable, entry: _Entry) -> None:
+        b = self._bucket(entry)
+        bucket = self.buckets[b]
+        del bucket[key]
+        if len(bucket) == 0:
+            del self.buckets[b]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from collections import deque
+from queue import ShutDown
+from threading import Condition, Lock
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    from pycoro.kernel.wakeup import Notifier
+
+
+class Ring[T]:
+    def __init__(self, size: int) -> None:
+        assert size > 0, "size must be greater than zero"
+
+        self.size: Final = size
+
+        # deque appends and pops are atomic, producers only serialize among
+        # themselves to respect the bound and consumers only take a lock when
+        # there is nothing to pop and they have to wait
+        self._buf: Final = deque[T]()
+        self._put: Final = Lock()
+        self._cv: Final = Condition()
+        self._waiting: int = 0
+        self._shutdown: bool = False
+        self._wakeup: Notifier | None = None
+
+    def signal(self, wakeup: Notifier) -> None:
+        self._wakeup = wakeup
+
+        # If items are already queued, signal immediately.
+        if len(self._buf) > 0:
+            wakeup.notify()
+
+    def put_nowait(self, item: T) -> bool:
+        with self._put:
+            if self._shutdown:
+                raise ShutDown
+            if len(self._buf) >= self.size:
+                return False
+            self._buf.append(item)
+
+        self._notify(1)
+        return True
+
+    def put_many(self, items: list[T], *, atomic: bool = False) -> int:
+        with self._put:
+            if self._shutdown:
+                raise ShutDown
+
+            n = min(len(items), self.size - len(self._buf))
+            if atomic and n < len(items):
+                return 0
+            self._buf.extend(items if n == len(items) else items[:n])
+
+        if n > 0:
+            self._notify(n)
+        return n
+
+    def pop(self, n: int) -> list[T]:
+        items: list[T] = []
+        for _ in range(n):
+            try:
+                items.append(self._buf.popleft())
+            except IndexError:
+                break
+        return items
+
+    def get(self) -> T:
+        try:
+            return self._buf.popleft()
+        except IndexError:
+            pass
+
+        with self._cv:
+            self._waiting += 1
+            try:
+                while True:
+                    try:
+                        return self._buf.popleft()
+                    except IndexError:
+                        pass
+
+                    # same as a shut down queue, drain before raising
+                    if self._shutdown:
+                        raise ShutDown
+                    _ = self._cv.wait()
+            finally:
+                self._waiting -= 1
+
+    def shutdown(self) -> None:
+        with self._put:
+            self._shutdown = True
+        with self._cv:
+            self._cv.notify_all()
+
+    def qsize(self) -> int:
+        return len(self._buf)
+
+    def _notify(self, n: int) -> None:
+        # a consumer registers as waiting before it checks for items one last
+        # time, so a producer that sees nobody waiting appended before then
+        if self._waiting > 0:
+            with self._cv:
+                self._cv.notify(n)
+
+        if self._wakeup is not None:
+            self._wakeup.notify()
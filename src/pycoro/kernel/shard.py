@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+from dataclasses import dataclass, field
+from functools import partial
+from threading import Lock, Thread
+from typing import TYPE_CHECKING, Any, Final, Protocol
+
+from pycoro.kernel import t_api
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable
+    from multiprocessing.process import BaseProcess
+    from threading import Event
+
+    from pycoro.api import API
+
+
+class Connection(Protocol):
+    def send(self, obj: Any) -> None: ...
+    def recv(self) -> Any: ...
+    def close(self) -> None: ...
+
+
+class System(Protocol):
+    @property
+    def api(self) -> API: ...
+    def loop(self) -> None: ...
+    def shutdown(self) -> Event: ...
+
+
+@dataclass(frozen=True)
+class Config:
+    shards: int
+    key: Callable[[t_api.Request[Any]], Hashable] | None = None
+
+
+@dataclass(eq=False)
+class _Shard:
+    process: BaseProcess
+    conn: Connection
+    send_lock: Lock = field(default_factory=Lock)
+    pending_lock: Lock = field(default_factory=Lock)
+    pending: dict[int, Callable[[t_api.Response[Any] | Exception], None]] = field(
+        default_factory=dict
+    )
+    reader: Thread | None = None
+
+
+def new(build: Callable[[], System], config: Config) -> _Sharded:
+    return _Sharded(build, config)
+
+
+class _Sharded:
+    def __init__(self, build: Callable[[], System], config: Config) -> None:
+        assert config.shards > 0, "must be at least one shard"
+
+        # every shard is a process running its own system, build is called in
+        # the shard to construct and start it so it must be picklable
+        ctx = multiprocessing.get_context("spawn")
+        self.config: Final = config
+        self.shards: Final[list[_Shard]] = []
+        for _ in range(config.shards):
+            conn, child = ctx.Pipe()
+            process = ctx.Process(target=_worker, args=(child, build), daemon=True)
+            self.shards.append(_Shard(process, conn))
+
+        self.ids: Final = itertools.count()
+        self.next: Final = itertools.count()
+        self.completed: bool = False
+
+    def start(self) -> None:
+        for shard in self.shards:
+            shard.process.start()
+            shard.reader = Thread(target=self._reader, args=(shard,), daemon=True)
+            shard.reader.start()
+
+    def shutdown(self) -> None:
+        self.completed = True
+        for shard in self.shards:
+            with shard.send_lock:
+                try:
+                    shard.conn.send(None)
+                except OSError:
+                    continue
+
+        # shards drain what they were sent before exiting
+        for shard in self.shards:
+            if shard.reader is not None:
+                shard.reader.join()
+            shard.process.join()
+            shard.conn.close()
+
+    def enqueue_sqe(self, sqe: SQE[t_api.Request[Any], t_api.Response[Any]]) -> None:
+        if self.completed:
+            sqe.callback(Error(StatusCode.STATUS_SYSTEM_SHUTTING_DOWN))
+            return
+
+        shard = self._route(sqe.submission)
+        seq = next(self.ids)
+
+        with shard.pending_lock:
+            shard.pending[seq] = sqe.callback
+
+        try:
+            with shard.send_lock:
+                shard.conn.send((seq, sqe.submission))
+        except Exception as e:
+            with shard.pending_lock:
+                callback = shard.pending.pop(seq, None)
+            if callback is not None:
+                callback(Error(StatusCode.STATUS_INTERNAL_SERVER_ERROR, e))
+
+    def _route(self, req: t_api.Request[Any]) -> _Shard:
+        if self.config.key is None:
+            return self.shards[next(self.next) % len(self.shards)]
+        return self.shards[hash(self.config.key(req)) % len(self.shards)]
+
+    def _reader(self, shard: _Shard) -> None:
+        while True:
+            try:
+                msg = shard.conn.recv()
+            except EOFError:
+                msg = None
+
+            if msg is None:
+                break
+
+            seq, res = msg
+            with shard.pending_lock:
+                callback = shard.pending.pop(seq)
+            callback(res)
+
+        # the shard exited, nothing is coming back for what is still pending
+        with shard.pending_lock:
+            pending = list(shard.pending.values())
+            shard.pending.clear()
+        for callback in pending:
+            callback(Error(StatusCode.STATUS_SYSTEM_SHUTTING_DOWN))
+
+
+def _worker(conn: Connection, build: Callable[[], System]) -> None:
+    system = build()
+    lock = Lock()
+
+    def respond(seq: int, res: t_api.Response[Any] | Exception) -> None:
+        with lock:
+            try:
+                conn.send((seq, res))
+            except Exception as e:
+                conn.send((seq, Error(StatusCode.STATUS_INTERNAL_SERVER_ERROR, e)))
+
+    def receive() -> None:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                msg = None
+
+            if msg is None:
+                break
+
+            seq, req = msg
+            system.api.enqueue_sqe(
+                SQE[t_api.Request[Any], t_api.Response[Any]](
+                    submission=req, callback=partial(respond, seq)
+                )
+            )
+
+        _ = system.shutdown()
+
+    Thread(target=receive, daemon=True).start()
+    system.loop()
+
+    with lock:
+        conn.send(None)
+    conn.close()
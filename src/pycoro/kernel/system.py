@@ -1,44 +1,93 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import datetime
-import threading
+import heapq
+import inspect
+import itertools
+import random
 import time
 from dataclasses import dataclass
-from threading import Event
-from typing import TYPE_CHECKING, Any, Final
+from threading import Event, Lock
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Final, overload
 
 import pycoro
 from pycoro.kernel.bus import CQE
+from pycoro.kernel.cache import new as new_cache
 from pycoro.kernel.t_api.error import Error
-from pycoro.kernel.t_api.status import StatusCode
+from pycoro.kernel.t_api.status import MAX_SUCCESS_RANGE, MIN_SUCCESS_RANGE, StatusCode
+from pycoro.kernel.wakeup import AsyncWakeup, Wakeup
+from pycoro.scheduler import DEFAULT_PRIORITY
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Generator, Hashable, Mapping
     from concurrent.futures import Future
+    from types import CoroutineType
 
     from pycoro.aio import AIO
     from pycoro.api import API
+    from pycoro.kernel.cache import Cache, Config as CacheConfig
     from pycoro.kernel.t_aio import Kind
     from pycoro.kernel.t_api import Request, Response
 
 
+@dataclass(frozen=True)
+class AdaptiveBatch:
+    target: datetime.timedelta = datetime.timedelta(milliseconds=1)
+    min_size: int = 1
+    max_size: int = 1024
+
+
 @dataclass(frozen=True)
 class Config:
     coroutine_max_size: int
     submission_batch_size: int
     completion_batch_size: int
     signal_timeout: datetime.timedelta = datetime.timedelta()
+    spawn_max_size: int | None = None
+    priorities: Mapping[str, int] | None = None
+    tick_max_steps: int | None = None
+    tick_max_time: datetime.timedelta | None = None
+    scheduler_workers: int = 1
+    adaptive_batch: AdaptiveBatch | None = None
+    background_period: datetime.timedelta = datetime.timedelta(milliseconds=100)
 
 
 @dataclass
 class BackgroundCoroutine:
-    coroutine: Callable[[], pycoro.CoroutineFunc[Kind, Kind, Any]]
+    coroutine: Callable[[], pycoro.AnyCoroutineFunc[Kind, Kind, Any]]
     name: str
-    last: int = 0
+    priority: str = DEFAULT_PRIORITY
+    interval: int = 0
+    jitter: int = 0
     future: Future[Any] | None = None
 
 
+@dataclass
+class BatchSizes:
+    submission: int
+    completion: int
+    tick_ns: int = 0
+
+
+@dataclass
+class Failures:
+    count: int = 0
+    last: BaseException | None = None
+
+
+@dataclass
+class Coalescing:
+    hits: int = 0
+    misses: int = 0
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return 0.0 if total == 0 else self.hits / total
+
+
 def new(api: API, aio: AIO, config: Config) -> _System:
     return _System(api, aio, config)
 
@@ -48,17 +97,50 @@ class _System:
         self.config: Final = config
         self.aio: Final = aio
         self.api: Final = api
-        self.scheduler: Final = pycoro.Scheduler(aio, config.coroutine_max_size)
+        self.scheduler: Final = pycoro.Scheduler(
+            aio,
+            config.coroutine_max_size,
+            config.spawn_max_size,
+            config.priorities,
+            config.scheduler_workers,
+        )
         self.on_request: dict[
             str,
             Callable[
                 [Request[Any], Callable[[Response[Any] | Exception], None]],
-                pycoro.CoroutineFunc[Kind, Kind, Any],
+                pycoro.AnyCoroutineFunc[Kind, Kind, Any],
             ],
         ] = {}
+        self.priorities: dict[str, str] = {}
+        self.coalesce: dict[str, Callable[[Any], Hashable]] = {}
+        self.coalescing: Final[dict[str, Coalescing]] = {}
+        self.inflight: Final[
+            dict[tuple[str, Hashable], list[Callable[[Response[Any] | Exception], None]]]
+        ] = {}
+        self.inflight_lock: Final = Lock()
+        self.caches: Final[dict[str, Cache]] = {}
+        # background coroutines without an interval run whenever the loop
+        # ticks, the rest wait in a heap ordered by when they are due next
         self.background: list[BackgroundCoroutine] = []
+        self.timers: Final[list[tuple[int, int, BackgroundCoroutine]]] = []
+        self.timers_seq: Final = itertools.count()
+        self.failures: Final[dict[str, Failures]] = {}
+        self.failures_lock: Final = Lock()
         self.shutdown_event: Final = Event()
-        self.short_circuit_event: Final = Event()
+        self.wakeup: Final = Wakeup()
+        self.async_wakeup: AsyncWakeup | None = None
+
+        # the configured batch sizes are where adaptive batching starts from
+        self.batch: Final = BatchSizes(config.submission_batch_size, config.completion_batch_size)
+        if config.adaptive_batch is not None:
+            assert config.adaptive_batch.target > datetime.timedelta(), (
+                "target tick latency must be greater than zero"
+            )
+            assert 0 < config.adaptive_batch.min_size <= config.adaptive_batch.max_size, (
+                "min batch size must be greater than zero and no greater than max batch size"
+            )
+            self.batch.submission = self.clamp(self.batch.submission)
+            self.batch.completion = self.clamp(self.batch.completion)
 
     def loop(self) -> None:
         try:
@@ -70,40 +152,69 @@ class _System:
                     self.scheduler.shutdown()
                     return
 
-                cancel = Event()
+                # the tick ran out of budget, go around again without waiting
+                # so completions and submissions interleave with the leftovers
+                if self.scheduler.gauges().runnable > 0:
+                    continue
+
+                # Register the wakeup, api and aio notify it as soon as there is
+                # work to do, so does shutdown.
+                self.api.signal(self.wakeup)
+                self.aio.signal(self.wakeup)
 
-                # These methods accept the cancel event and return their own completion Events
-                api_signal = self.api.signal(cancel)
-                aio_signal = self.aio.signal(cancel)
+                # wait for a signal, short circuit, timeout, or the next
+                # coroutine deadline; whichever occurs first.
+                _ = self.wakeup.wait(self.timeout(int(time.time() * 1000)))
 
-                # wait for a signal, short circuit, or timeout; whichever occurs first.
-                # Python threading lacks a native 'select', so we poll the events.
-                timeout_seconds = self.config.signal_timeout.total_seconds()
-                start_time = time.time()
+        finally:
+            self.shutdown_event.set()
 
-                while True:
-                    # Check if any event is set (Simulating Go 'case <-signal')
-                    if (
-                        api_signal.is_set()
-                        or aio_signal.is_set()
-                        or self.short_circuit_event.is_set()
-                    ):
-                        break
+    async def run_async(self) -> None:
+        # same as loop but on the running event loop, api and aio wake it up
+        # through call_soon_threadsafe instead of a dedicated thread
+        self.async_wakeup = AsyncWakeup(asyncio.get_running_loop())
+        try:
+            while True:
+                self.tick(int(time.time() * 1000))
 
-                    if (time.time() - start_time) > timeout_seconds:
-                        break
+                if self.done():
+                    self.aio.shutdown()
+                    self.scheduler.shutdown()
+                    return
 
-                    # Short sleep to prevent CPU spinning
-                    time.sleep(0.01)
+                # yield to other tasks between ticks that ran out of budget
+                if self.scheduler.gauges().runnable > 0:
+                    await asyncio.sleep(0)
+                    continue
 
-                cancel.set()
+                self.api.signal(self.async_wakeup)
+                self.aio.signal(self.async_wakeup)
 
-                _ = api_signal.wait()
-                _ = aio_signal.wait()
+                with contextlib.suppress(TimeoutError):
+                    async with asyncio.timeout(self.timeout(int(time.time() * 1000))):
+                        await self.async_wakeup.wait()
 
         finally:
             self.shutdown_event.set()
 
+    def timeout(self, time: int) -> float | None:
+        timeout = self.config.signal_timeout.total_seconds() or None
+
+        # jobs without an interval run every tick, an idle loop still has to
+        # tick every so often for them
+        if len(self.background) > 0:
+            period = self.config.background_period.total_seconds()
+            timeout = period if timeout is None else min(timeout, period)
+
+        deadline = self.scheduler.next_deadline()
+        if len(self.timers) > 0:
+            deadline = self.timers[0][0] if deadline is None else min(deadline, self.timers[0][0])
+        if deadline is None:
+            return timeout
+
+        until = max(deadline - time, 0) / 1000
+        return until if timeout is None else min(timeout, until)
+
     def tick(self, time: int) -> None:
         assert self.config.submission_batch_size > 0, (
             "submission batch size must be greater that zero"
@@ -112,89 +223,415 @@ class _System:
             "completion batch size must be greater than zero"
         )
 
-        for i, cqe in enumerate(self.aio.dequeue_cqe(self.config.completion_batch_size)):
-            assert i < self.config.completion_batch_size, (
+        start = perf_counter_ns()
+
+        cqes = self.aio.dequeue_cqe(self.batch.completion)
+        for i, cqe in enumerate(cqes):
+            assert i < self.batch.completion, (
                 "cqes length be no greater than the completion batch size"
             )
             cqe.invoke()
 
         for bg in self.background:
-            timeout_ms = self.config.signal_timeout.total_seconds()
-            if (
-                not self.api.done()
-                and (time - bg.last) >= timeout_ms
-                and (bg.future is None or bg.future.done())
-            ):
-                bg.last = time
-                future = pycoro.add(self.scheduler, bg.coroutine())
-                if future is None:
-                    continue
-                bg.future = future
-                self.await_in_background(bg.future)
+            self.run_in_background(bg)
+
+        while len(self.timers) > 0 and self.timers[0][0] <= time:
+            _, _, bg = heapq.heappop(self.timers)
+            self.run_in_background(bg)
+
+            due = time + bg.interval
+            if bg.jitter > 0:
+                due += random.randint(0, bg.jitter)
+            heapq.heappush(self.timers, (due, next(self.timers_seq), bg))
 
-        for i, sqe in enumerate(self.api.dequeue_sqe(self.config.submission_batch_size)):
-            assert i < self.config.submission_batch_size, (
+        sqes = self.api.dequeue_sqe(self.batch.submission)
+        for i, sqe in enumerate(sqes):
+            assert i < self.batch.submission, (
                 "sqes length be no greater than the submission batch size"
             )
 
-            coroutine = self.on_request.get(sqe.submission.kind())
-            assert coroutine is not None, (
-                f"no registered coroutine for request kind {sqe.submission.kind()}"
-            )
+            kind = sqe.submission.kind()
+            coroutine = self.on_request.get(kind)
+            assert coroutine is not None, f"no registered coroutine for request kind {kind}"
+
+            callback = sqe.callback
+            cache = self.caches.get(kind)
+            if cache is not None:
+                cached = cache.config.key(sqe.submission.payload)
+                res = cache.get(cached, time)
+                if res is not None:
+                    self.respond_from_cache(kind, cache, cached, res, callback)
+                    continue
+                callback = self.fill(cache, cached, time, callback)
+
+            key = self.coalesce.get(kind)
+            if key is not None:
+                coalesced = self.join(kind, key(sqe.submission.payload), callback)
+                if coalesced is None:
+                    continue
+                callback = coalesced
 
-            future = pycoro.add(self.scheduler, coroutine(sqe.submission, sqe.callback))
+            future = pycoro.add(
+                self.scheduler,
+                coroutine(sqe.submission, callback),
+                sqe.submission.deadline,
+                self.priorities[kind],
+            )
             if future is None:
-                sqe.callback(Error(StatusCode.STATUS_SCHEDULER_QUEUE_FULL))
+                callback(Error(StatusCode.STATUS_SCHEDULER_QUEUE_FULL))
             else:
-                self.await_in_background(future)
+                self.await_in_background(kind, future)
+                self.respond_on_timeout(future, callback)
+                self.respond_on_failure(future, callback)
+
+        max_ns = None
+        if self.config.tick_max_time is not None:
+            max_ns = int(self.config.tick_max_time.total_seconds() * 1_000_000_000)
 
-        self.scheduler.run_until_blocked(time)
+        self.scheduler.run_until_blocked(time, self.config.tick_max_steps, max_ns)
         self.aio.flush(time)
 
-    def await_in_background(self, future: Future[Any]) -> None:
-        def _() -> None:
-            with contextlib.suppress(Exception):
-                future.result()
+        self.batch.tick_ns = perf_counter_ns() - start
+        if self.config.adaptive_batch is not None:
+            self.resize(len(sqes), len(cqes))
 
-        thread = threading.Thread(target=_, daemon=True)
-        thread.start()
+    def resize(self, submissions: int, completions: int) -> None:
+        self.batch.submission = self.adapt(
+            self.batch.submission, submissions, self.api.depth(), self.batch.tick_ns
+        )
+        self.batch.completion = self.adapt(
+            self.batch.completion, completions, self.aio.depth(), self.batch.tick_ns
+        )
+
+    def adapt(self, size: int, used: int, depth: int, tick_ns: int) -> int:
+        adaptive = self.config.adaptive_batch
+        assert adaptive is not None
+
+        # halve when the tick overran its target, double while a backlog is
+        # left behind, and shrink back slowly once batches run mostly empty
+        if tick_ns > adaptive.target.total_seconds() * 1_000_000_000:
+            return self.clamp(size // 2)
+        if depth > 0 and used == size:
+            return self.clamp(size * 2)
+        if used <= size // 4:
+            return self.clamp(size - size // 4)
+        return size
+
+    def clamp(self, size: int) -> int:
+        adaptive = self.config.adaptive_batch
+        assert adaptive is not None
+        return max(adaptive.min_size, min(size, adaptive.max_size))
+
+    def check_priority(self, priority: str) -> None:
+        # the run queue only finds out about an unknown class on the loop
+        # thread, by then there is nobody left to tell
+        classes = self.config.priorities or {DEFAULT_PRIORITY: 1}
+        assert priority in classes, f"unknown priority class {priority}"
+
+    def run_in_background(self, bg: BackgroundCoroutine) -> None:
+        # a run that has not finished yet is not overlapped, it is skipped
+        if self.api.done() or (bg.future is not None and not bg.future.done()):
+            return
+
+        future = pycoro.add(self.scheduler, bg.coroutine(), priority=bg.priority)
+        if future is None:
+            return
+        bg.future = future
+        self.await_in_background(bg.name, bg.future)
+
+    def await_in_background(self, kind: str, future: Future[Any]) -> None:
+        # done callbacks run on whichever thread completes the future
+        def _(future: Future[Any]) -> None:
+            e = future.exception()
+            if e is None:
+                return
+
+            with self.failures_lock:
+                failures = self.failures.setdefault(kind, Failures())
+                failures.count += 1
+                failures.last = e
+
+        future.add_done_callback(_)
+
+    def respond_on_timeout(
+        self, future: Future[Any], callback: Callable[[Response[Any] | Exception], None]
+    ) -> None:
+        # a coroutine that exceeds its deadline never produces a response
+        def _(future: Future[Any]) -> None:
+            e = future.exception()
+            if isinstance(e, TimeoutError):
+                self.api.enqueue_cqe(
+                    CQE(completion=Error(StatusCode.STATUS_REQUEST_TIMEOUT, e), callback=callback)
+                )
+
+        future.add_done_callback(_)
+
+    def respond_on_failure(
+        self, future: Future[Any], callback: Callable[[Response[Any] | Exception], None]
+    ) -> None:
+        # a coroutine that raises never produces a response, the caller and
+        # any coalesced requests would otherwise wait on it forever
+        def _(future: Future[Any]) -> None:
+            e = future.exception()
+            if isinstance(e, Exception) and not isinstance(e, TimeoutError):
+                self.api.enqueue_cqe(
+                    CQE(
+                        completion=Error(StatusCode.STATUS_INTERNAL_SERVER_ERROR, e),
+                        callback=callback,
+                    )
+                )
+
+        future.add_done_callback(_)
+
+    def join(
+        self, kind: str, key: Hashable, callback: Callable[[Response[Any] | Exception], None]
+    ) -> Callable[[Response[Any] | Exception], None] | None:
+        with self.inflight_lock:
+            coalescing = self.coalescing.setdefault(kind, Coalescing())
+            waiting = self.inflight.get((kind, key))
+            if waiting is not None:
+                coalescing.hits += 1
+                waiting.append(callback)
+                return None
+
+            coalescing.misses += 1
+            self.inflight[(kind, key)] = [callback]
+
+        # completes every request that joined, the first response wins
+        def _(res: Response[Any] | Exception) -> None:
+            with self.inflight_lock:
+                waiting = self.inflight.pop((kind, key), [])
+
+            for waiter in waiting:
+                waiter(res)
+
+        return _
+
+    def respond_from_cache(
+        self,
+        kind: str,
+        cache: Cache,
+        key: Hashable,
+        res: Response[Any],
+        callback: Callable[[Response[Any] | Exception], None],
+    ) -> None:
+        # a hit is answered on the loop thread, a callback that raises must
+        # not take the loop down with it
+        try:
+            callback(res)
+        except Exception as e:
+            _ = cache.invalidate(key)
+            with self.failures_lock:
+                failures = self.failures.setdefault(kind, Failures())
+                failures.count += 1
+                failures.last = e
+
+    def fill(
+        self,
+        cache: Cache,
+        key: Hashable,
+        time: int,
+        callback: Callable[[Response[Any] | Exception], None],
+    ) -> Callable[[Response[Any] | Exception], None]:
+        # entries expire a ttl after the request was taken, never later than a
+        # ttl after the response was produced
+        def _(res: Response[Any] | Exception) -> None:
+            # only a response the callback took without raising is cached, a
+            # bad one would fail every hit after it on the loop thread
+            callback(res)
+            if (
+                not isinstance(res, Exception)
+                and MIN_SUCCESS_RANGE <= res.status < MAX_SUCCESS_RANGE
+            ):
+                cache.put(key, res, time)
+
+        return _
 
     def shutdown(self) -> Event:
         self.api.shutdown()
-        self.short_circuit_event.set()
+        self.wakeup.notify()
+        if self.async_wakeup is not None:
+            self.async_wakeup.notify()
         return self.shutdown_event
 
     def done(self) -> bool:
         return self.api.done() and self.scheduler.size() == 0
 
+    @overload
     def add_on_request(
         self,
         kind: str,
         constructor: Callable[[pycoro.Coroutine[Kind, Kind, Any], Request[Any]], Response[Any]],
+        priority: str = ...,
+        coalesce: Callable[[Any], Hashable] | None = ...,
+        cache: CacheConfig | None = ...,
+    ) -> None: ...
+    @overload
+    def add_on_request(
+        self,
+        kind: str,
+        constructor: Callable[
+            [pycoro.GeneratorCoroutine[Kind, Kind, Any], Request[Any]],
+            Generator[Any, Any, Response[Any]],
+        ],
+        priority: str = ...,
+        coalesce: Callable[[Any], Hashable] | None = ...,
+        cache: CacheConfig | None = ...,
+    ) -> None: ...
+    @overload
+    def add_on_request(
+        self,
+        kind: str,
+        constructor: Callable[
+            [pycoro.AsyncCoroutine[Kind, Kind, Any], Request[Any]],
+            CoroutineType[Any, Any, Response[Any]],
+        ],
+        priority: str = ...,
+        coalesce: Callable[[Any], Hashable] | None = ...,
+        cache: CacheConfig | None = ...,
+    ) -> None: ...
+    def add_on_request(
+        self,
+        kind: str,
+        constructor: Callable[..., Any],
+        priority: str = DEFAULT_PRIORITY,
+        coalesce: Callable[[Any], Hashable] | None = None,
+        cache: CacheConfig | None = None,
     ) -> None:
-        def _(
-            req: Request[Any], callback: Callable[[Response[Any] | Exception], None]
-        ) -> pycoro.CoroutineFunc[Kind, Kind, Any]:
-            def _(c: pycoro.Coroutine[Kind, Kind, Any]) -> Any:
-                c.set("config", self.config)
+        self.check_priority(priority)
+
+        if inspect.iscoroutinefunction(constructor):
+
+            def _(
+                req: Request[Any], callback: Callable[[Response[Any] | Exception], None]
+            ) -> pycoro.AnyCoroutineFunc[Kind, Kind, Any]:
+                async def _(c: pycoro.AsyncCoroutine[Kind, Kind, Any]) -> Any:
+                    c.set("config", self.config)
+                    c.set("caches", self.caches)
+
+                    res = await constructor(c, req)
+                    self.api.enqueue_cqe(CQE(completion=res, callback=callback))
+
+                return _
+
+        elif inspect.isgeneratorfunction(constructor):
 
-                res = constructor(c, req)
-                self.api.enqueue_cqe(CQE(completion=res, callback=callback))
+            def _(
+                req: Request[Any], callback: Callable[[Response[Any] | Exception], None]
+            ) -> pycoro.AnyCoroutineFunc[Kind, Kind, Any]:
+                def _(c: pycoro.GeneratorCoroutine[Kind, Kind, Any]) -> Generator[Any, Any, Any]:
+                    c.set("config", self.config)
+                    c.set("caches", self.caches)
 
-            return _
+                    g: Generator[Any, Any, Response[Any]] = constructor(c, req)
+                    res = yield from g
+                    self.api.enqueue_cqe(CQE(completion=res, callback=callback))
+
+                return _
+
+        else:
+
+            def _(
+                req: Request[Any], callback: Callable[[Response[Any] | Exception], None]
+            ) -> pycoro.AnyCoroutineFunc[Kind, Kind, Any]:
+                def _(c: pycoro.Coroutine[Kind, Kind, Any]) -> Any:
+                    c.set("config", self.config)
+                    c.set("caches", self.caches)
+
+                    res = constructor(c, req)
+                    self.api.enqueue_cqe(CQE(completion=res, callback=callback))
+
+                return _
 
         self.on_request[kind] = _
+        self.priorities[kind] = priority
+        if coalesce is not None:
+            self.coalesce[kind] = coalesce
+        if cache is not None:
+            self.caches[kind] = new_cache(cache)
 
+    @overload
     def add_background(
         self,
         name: str,
         constructor: Callable[[pycoro.Coroutine[Kind, Kind, Any]], Any],
+        priority: str = ...,
+        interval: datetime.timedelta | None = ...,
+        jitter: datetime.timedelta | None = ...,
+    ) -> None: ...
+    @overload
+    def add_background(
+        self,
+        name: str,
+        constructor: Callable[
+            [pycoro.GeneratorCoroutine[Kind, Kind, Any]], Generator[Any, Any, Any]
+        ],
+        priority: str = ...,
+        interval: datetime.timedelta | None = ...,
+        jitter: datetime.timedelta | None = ...,
+    ) -> None: ...
+    @overload
+    def add_background(
+        self,
+        name: str,
+        constructor: Callable[
+            [pycoro.AsyncCoroutine[Kind, Kind, Any]], CoroutineType[Any, Any, Any]
+        ],
+        priority: str = ...,
+        interval: datetime.timedelta | None = ...,
+        jitter: datetime.timedelta | None = ...,
+    ) -> None: ...
+    def add_background(
+        self,
+        name: str,
+        constructor: Callable[..., Any],
+        priority: str = DEFAULT_PRIORITY,
+        interval: datetime.timedelta | None = None,
+        jitter: datetime.timedelta | None = None,
     ) -> None:
-        def _() -> pycoro.CoroutineFunc[Kind, Kind, Any]:
-            def _(c: pycoro.Coroutine[Kind, Kind, Any]) -> Any:
-                c.set("config", self.config)
-                return constructor(c)
+        self.check_priority(priority)
+
+        if inspect.iscoroutinefunction(constructor):
+
+            def _() -> pycoro.AnyCoroutineFunc[Kind, Kind, Any]:
+                async def _(c: pycoro.AsyncCoroutine[Kind, Kind, Any]) -> Any:
+                    c.set("config", self.config)
+                    c.set("caches", self.caches)
+                    return await constructor(c)
+
+                return _
+
+        elif inspect.isgeneratorfunction(constructor):
 
-            return _
+            def _() -> pycoro.AnyCoroutineFunc[Kind, Kind, Any]:
+                def _(c: pycoro.GeneratorCoroutine[Kind, Kind, Any]) -> Generator[Any, Any, Any]:
+                    c.set("config", self.config)
+                    c.set("caches", self.caches)
+                    g: Generator[Any, Any, Any] = constructor(c)
+                    return (yield from g)
 
-        self.background.append(BackgroundCoroutine(name=name, coroutine=_))
+                return _
+
+        else:
+
+            def _() -> pycoro.AnyCoroutineFunc[Kind, Kind, Any]:
+                def _(c: pycoro.Coroutine[Kind, Kind, Any]) -> Any:
+                    c.set("config", self.config)
+                    c.set("caches", self.caches)
+                    return constructor(c)
+
+                return _
+
+        bg = BackgroundCoroutine(
+            name=name,
+            coroutine=_,
+            priority=priority,
+            interval=int((interval or self.config.signal_timeout).total_seconds() * 1000),
+            jitter=0 if jitter is None else int(jitter.total_seconds() * 1000),
+        )
+        if bg.interval == 0:
+            self.background.append(bg)
+        else:
+            # due on the first tick, every run after that is due an interval
+            # plus jitter after the previous one started
+            heapq.heappush(self.timers, (0, next(self.timers_seq), bg))
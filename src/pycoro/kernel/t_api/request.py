@@ -13,6 +13,7 @@ class RequestPayload(Protocol):
 @dataclass(frozen=True)
 class Request[T: RequestPayload]:
     payload: T
+    deadline: int | None = None
 
     def kind(self) -> str:
         return self.payload.kind()
@@ -14,6 +14,7 @@ class StatusCode(IntEnum):
     STATUS_NO_CONTENT = 20400
 
     STATUS_FIELD_VALIDATION_ERROR = 40000
+    STATUS_API_RATE_LIMITED = 42900
 
     # Platform level status (50000-59999)
     STATUS_INTERNAL_SERVER_ERROR = 50000
@@ -21,10 +22,14 @@ class StatusCode(IntEnum):
     STATUS_AIO_MATCH_ERROR = 50002
     STATUS_AIO_QUEUE_ERROR = 50003
     STATUS_AIO_STORE_ERROR = 50004
+    STATUS_AIO_FUNCTION_ERROR = 50005
+    STATUS_AIO_TASK_ERROR = 50006
     STATUS_SYSTEM_SHUTTING_DOWN = 50300
     STATUS_API_SUBMISSION_QUEUE_FULL = 50301
     STATUS_AIO_SUBMISSION_QUEUE_FULL = 50302
     STATUS_SCHEDULER_QUEUE_FULL = 50303
+    STATUS_API_OVERLOADED = 50304
+    STATUS_REQUEST_TIMEOUT = 50400
 
     @override
     def __str__(self) -> str:
@@ -33,15 +38,20 @@ class StatusCode(IntEnum):
             self.STATUS_CREATED: "The request was successful",
             self.STATUS_NO_CONTENT: "The request was successful",
             self.STATUS_FIELD_VALIDATION_ERROR: "The request is invalid",
+            self.STATUS_API_RATE_LIMITED: "The request was rate limited",
             self.STATUS_INTERNAL_SERVER_ERROR: "There was an internal server error",
             self.STATUS_AIO_ECHO_ERROR: "There was an error in the echo subsystem",
             self.STATUS_AIO_MATCH_ERROR: "There was an error in the match subsystem",
             self.STATUS_AIO_QUEUE_ERROR: "There was an error in the queue subsystem",
             self.STATUS_AIO_STORE_ERROR: "There was an error in the store subsystem",
+            self.STATUS_AIO_FUNCTION_ERROR: "There was an error in the function subsystem",
+            self.STATUS_AIO_TASK_ERROR: "There was an error in the task subsystem",
             self.STATUS_SYSTEM_SHUTTING_DOWN: "The system is shutting down",
             self.STATUS_API_SUBMISSION_QUEUE_FULL: "The api submission queue is full",
             self.STATUS_AIO_SUBMISSION_QUEUE_FULL: "The aio submission queue is full",
             self.STATUS_SCHEDULER_QUEUE_FULL: "The scheduler queue is full",
+            self.STATUS_API_OVERLOADED: "The api is overloaded",
+            self.STATUS_REQUEST_TIMEOUT: "The request exceeded its deadline",
         }
         try:
             return messages[self]
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import asyncio
+from threading import Condition
+from typing import Final, Protocol
+
+
+class Notifier(Protocol):
+    def notify(self) -> None: ...
+
+
+class Wakeup:
+    def __init__(self) -> None:
+        self._cv: Final = Condition()
+        self._notified: bool = False
+
+    def notify(self) -> None:
+        # a pending notification has not been consumed yet, the waiter is
+        # bound to observe everything that happened before this call
+        if self._notified:
+            return
+
+        with self._cv:
+            self._notified = True
+            self._cv.notify()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        with self._cv:
+            notified = self._cv.wait_for(lambda: self._notified, timeout)
+            self._notified = False
+        return notified
+
+
+class AsyncWakeup:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop: Final = loop
+        self._event: Final = asyncio.Event()
+        self._notified: bool = False
+
+    def notify(self) -> None:
+        # same as above, a pending notification already has a callback
+        # scheduled on the loop
+        if self._notified:
+            return
+
+        self._notified = True
+        try:
+            _ = self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # the loop is closed, there is nobody left to wake up
+            return
+
+    async def wait(self) -> None:
+        try:
+            _ = await self._event.wait()
+        finally:
+            # reset the flag before the event, a notify in between schedules
+            # a set that only runs on the loop after this wait returns
+            self._notified = False
+            self._event.clear()
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import heapq
+import itertools
 import queue
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
+from threading import Lock
+from time import perf_counter_ns
 from typing import TYPE_CHECKING, Any, Final, Protocol
 
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Mapping
     from concurrent.futures import Future
 
+DEFAULT_PRIORITY: Final = "default"
+
 
 class IO[I, O](Protocol):
     def dispatch(self, v: I | None, cb: Callable[[O | Exception], None]) -> None: ...
@@ -17,60 +24,220 @@ class Coroutine[I, O](Protocol):
     def resume(
         self,
     ) -> tuple[
-        I | None,
-        Future[O] | None,
+        tuple[I, ...],
+        tuple[Future[O], ...],
         Coroutine[I, O] | None,
         Future[Any] | None,
         bool,
     ]: ...
     def set_time(self, time: int) -> None: ...
+    def expires(self) -> int | None: ...
+    def expire(self) -> None: ...
+    def reject(self, e: Exception) -> None: ...
+    def priority(self) -> str: ...
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, eq=False)
 class AwaitingCoroutine[I, O]:
     coroutine: Coroutine[I, O]
     on: Future[Any]
 
 
+class SpawnLimitError(Exception):
+    def __init__(self, spawn_size: int) -> None:
+        super().__init__(f"spawned coroutine limit of {spawn_size} reached")
+
+
+@dataclass(frozen=True)
+class Gauges:
+    live: int
+    spawned: int
+    parked: int
+    runnable: int
+
+
+@dataclass(frozen=True)
+class ClassStats:
+    depth: int
+    steps: int
+    waited_ns: int
+    max_waited_ns: int
+
+
+@dataclass(eq=False)
+class _Class[I, O]:
+    name: str
+    weight: int
+    runnable: deque[tuple[Coroutine[I, O], int]] = field(default_factory=deque)
+    deficit: int = 0
+    steps: int = 0
+    waited_ns: int = 0
+    max_waited_ns: int = 0
+
+
+class RunQueue[I, O]:
+    def __init__(self, weights: Mapping[str, int]) -> None:
+        assert len(weights) > 0, "must be at least one priority class"
+        assert all(w > 0 for w in weights.values()), "weights must be greater than zero"
+
+        self._classes: Final = {name: _Class[I, O](name, w) for name, w in weights.items()}
+
+        # classes with runnable coroutines, served deficit round robin where
+        # every step costs one and a class earns its weight per round
+        self._active: Final = deque[_Class[I, O]]()
+        self._len: int = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def append(self, c: Coroutine[I, O]) -> None:
+        self._append(c, perf_counter_ns())
+
+    def pop(self) -> Coroutine[I, O] | None:
+        if len(self._active) == 0:
+            return None
+
+        cls, c, enqueued = self._next()
+
+        waited = perf_counter_ns() - enqueued
+        cls.steps += 1
+        cls.waited_ns += waited
+        cls.max_waited_ns = max(cls.max_waited_ns, waited)
+        return c
+
+    def steal(self, n: int) -> list[tuple[Coroutine[I, O], int]]:
+        # moving coroutines between queues is not a step, they keep the time
+        # they were first enqueued at and are accounted for once they run
+        stolen: list[tuple[Coroutine[I, O], int]] = []
+        while len(stolen) < n and len(self._active) > 0:
+            _, c, enqueued = self._next()
+            stolen.append((c, enqueued))
+        return stolen
+
+    def adopt(self, stolen: list[tuple[Coroutine[I, O], int]]) -> None:
+        for c, enqueued in stolen:
+            self._append(c, enqueued)
+
+    def _append(self, c: Coroutine[I, O], enqueued: int) -> None:
+        cls = self._classes.get(c.priority())
+        assert cls is not None, f"unknown priority class {c.priority()}"
+
+        if len(cls.runnable) == 0:
+            self._active.append(cls)
+        cls.runnable.append((c, enqueued))
+        self._len += 1
+
+    def _next(self) -> tuple[_Class[I, O], Coroutine[I, O], int]:
+        cls = self._active[0]
+        if cls.deficit == 0:
+            cls.deficit = cls.weight
+
+        c, enqueued = cls.runnable.popleft()
+        cls.deficit -= 1
+        self._len -= 1
+
+        if len(cls.runnable) == 0:
+            cls.deficit = 0
+            _ = self._active.popleft()
+        elif cls.deficit == 0:
+            self._active.rotate(-1)
+
+        return cls, c, enqueued
+
+    def stats(self) -> dict[str, ClassStats]:
+        return {
+            cls.name: ClassStats(
+                depth=len(cls.runnable),
+                steps=cls.steps,
+                waited_ns=cls.waited_ns,
+                max_waited_ns=cls.max_waited_ns,
+            )
+            for cls in self._classes.values()
+        }
+
+
 class Scheduler[I, O]:
-    def __init__(self, io: IO[I, O], size: int) -> None:
+    def __init__(
+        self,
+        io: IO[I, O],
+        size: int,
+        spawn_size: int,
+        weights: Mapping[str, int] | None = None,
+    ) -> None:
         self._io: Final = io
+        self._size: Final = size
+        self._spawn_size: Final = spawn_size
         self._in: Final = queue.Queue[Coroutine[I, O]](size)
-        self._runnable: list[Coroutine[I, O]] = []
-        self._awaiting: list[AwaitingCoroutine[I, O]] = []
+
+        # admitted coroutines count against size until they are done, spawned
+        # coroutines count against spawn size, so the executor never needs more
+        # than size + spawn size threads
+        self._live: int = 0
+        self._live_lock: Final = Lock()
+        self._spawned: Final = set[Coroutine[I, O]]()
+        self._runnable: Final = RunQueue[I, O](weights or {DEFAULT_PRIORITY: 1})
+        self._awaiting: Final = set[AwaitingCoroutine[I, O]]()
+
+        # awaiting coroutines whose promise has completed, appended to by the
+        # promise's done callback which may run on any thread
+        self._ready: Final = deque[AwaitingCoroutine[I, O]]()
+
+        # awaiting coroutines ordered by the time their wait expires, entries
+        # for coroutines that have since been resumed are dropped lazily
+        self._deadlines: Final = list[tuple[int, int, AwaitingCoroutine[I, O]]]()
+        self._seq: Final = itertools.count()
         self._closed: bool = False
 
     def add(self, c: Coroutine[I, O]) -> bool:
         if self._closed:
             return False
 
+        with self._live_lock:
+            if self._live >= self._size:
+                return False
+            self._live += 1
+
         try:
             self._in.put_nowait(c)
         except queue.Full:
+            self._retire(c)
             return False
         return True
 
-    def run_until_blocked(self, time: int) -> None:
-        batch(self._in, self._in.qsize(), lambda c: self._runnable.append(c))
-        self.tick(time)
-        assert len(self._runnable) == 0, "runnable should be empty"
+    def run_until_blocked(
+        self, time: int, max_steps: int | None = None, max_ns: int | None = None
+    ) -> None:
+        batch(self._in, self._in.qsize(), self._runnable.append)
+        self.tick(time, max_steps, max_ns)
+        assert max_steps is not None or max_ns is not None or len(self._runnable) == 0, (
+            "runnable should be empty"
+        )
 
-    def tick(self, time: int) -> None:
+    def tick(self, time: int, max_steps: int | None = None, max_ns: int | None = None) -> None:
         self.unblock()
+        self.expire(time)
+
+        # coroutines left over when the budget runs out stay runnable for the
+        # next tick
+        until = None if max_ns is None else perf_counter_ns() + max_ns
+        steps = 0
+        while max_steps is None or steps < max_steps:
+            if until is not None and perf_counter_ns() >= until:
+                break
 
-        while True:
             ok = self.step(time)
             if not ok:
                 break
+            steps += 1
 
     def step(self, time: int) -> bool:
-        coroutine = dequeue(self._runnable)
+        coroutine = self._runnable.pop()
         if coroutine is None:
             return False
         coroutine.set_time(time)
 
-        value, promise, spawn, wait, done = coroutine.resume()
-        if promise is not None:
+        values, promises, spawn, wait, done = coroutine.resume()
+        if len(promises) > 0:
 
             def _(promise: Future[O], v: O | Exception) -> None:
                 match v:
@@ -79,15 +246,31 @@ class Scheduler[I, O]:
                     case _:
                         promise.set_result(v)
 
-            self._io.dispatch(value, lambda v, promise=promise: _(promise, v))
+            for value, promise in zip(values, promises, strict=True):
+                self._io.dispatch(value, lambda v, promise=promise: _(promise, v))
 
             self._runnable.append(coroutine)
         elif spawn is not None:
-            self._runnable.append(spawn)
+            if len(self._spawned) >= self._spawn_size:
+                spawn.reject(SpawnLimitError(self._spawn_size))
+            else:
+                self._spawned.add(spawn)
+                self._runnable.append(spawn)
             self._runnable.append(coroutine)
         elif wait is not None:
-            self._awaiting.append(AwaitingCoroutine[I, O](coroutine, wait))
+            deadline = coroutine.expires()
+            if deadline is not None and deadline <= time:
+                coroutine.expire()
+                self._runnable.append(coroutine)
+                return True
+
+            awaiting = AwaitingCoroutine[I, O](coroutine, wait)
+            self._awaiting.add(awaiting)
+            if deadline is not None:
+                heapq.heappush(self._deadlines, (deadline, next(self._seq), awaiting))
+            wait.add_done_callback(lambda _, awaiting=awaiting: self._ready.append(awaiting))
         elif done:
+            self._retire(coroutine)
             self.unblock()
         else:
             msg = "unreachable"
@@ -97,21 +280,61 @@ class Scheduler[I, O]:
     def size(self) -> int:
         return len(self._runnable) + len(self._awaiting) + self._in.qsize()
 
+    def gauges(self) -> Gauges:
+        return Gauges(
+            live=self._live + len(self._spawned),
+            spawned=len(self._spawned),
+            parked=len(self._awaiting),
+            runnable=len(self._runnable),
+        )
+
+    def stats(self) -> dict[str, ClassStats]:
+        return self._runnable.stats()
+
+    def _retire(self, c: Coroutine[I, O]) -> None:
+        if c in self._spawned:
+            self._spawned.remove(c)
+            return
+
+        with self._live_lock:
+            self._live -= 1
+
     def shutdown(self) -> None:
         self._closed = True
         self._in.shutdown()
         self._in.join()
 
+    def next_deadline(self) -> int | None:
+        while len(self._deadlines) > 0:
+            deadline, _, awaiting = self._deadlines[0]
+            if awaiting in self._awaiting:
+                return deadline
+            _ = heapq.heappop(self._deadlines)
+        return None
+
     def unblock(self) -> None:
-        i = 0
-        for coroutine in self._awaiting:
-            if coroutine.on.done():
-                self._runnable.append(coroutine.coroutine)
-            else:
-                self._awaiting[i] = coroutine
-                i += 1
+        while True:
+            try:
+                awaiting = self._ready.popleft()
+            except IndexError:
+                return
 
-        self._awaiting = self._awaiting[:i]
+            # the wait may have expired before its promise completed
+            if awaiting not in self._awaiting:
+                continue
+
+            self._awaiting.remove(awaiting)
+            self._runnable.append(awaiting.coroutine)
+
+    def expire(self, time: int) -> None:
+        while len(self._deadlines) > 0 and self._deadlines[0][0] <= time:
+            _, _, awaiting = heapq.heappop(self._deadlines)
+            if awaiting not in self._awaiting:
+                continue
+
+            self._awaiting.remove(awaiting)
+            awaiting.coroutine.expire()
+            self._runnable.append(awaiting.coroutine)
 
 
 def batch[T](c: queue.Queue[T], n: int, f: Callable[[T], None]) -> None:
@@ -123,11 +346,3 @@ def batch[T](c: queue.Queue[T], n: int, f: Callable[[T], None]) -> None:
 
         f(item)
         c.task_done()
-
-
-def dequeue[T](c: list[T]) -> T | None:
-    try:
-        item = c.pop(0)
-    except IndexError:
-        return None
-    return item
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import queue
+from collections import deque
+from dataclasses import dataclass, field
+from threading import Barrier, Lock, Thread
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Final
+
+from pycoro.scheduler import (
+    DEFAULT_PRIORITY,
+    AwaitingCoroutine,
+    ClassStats,
+    Coroutine,
+    Gauges,
+    RunQueue,
+    SpawnLimitError,
+    batch,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+    from concurrent.futures import Future
+
+    from pycoro.scheduler import IO
+
+
+@dataclass(eq=False)
+class _Shard[I, O]:
+    runnable: RunQueue[I, O]
+    lock: Lock = field(default_factory=Lock)
+    awaiting: set[AwaitingCoroutine[I, O]] = field(default_factory=set)
+
+    # appended to by the done callback of the promise a coroutine parked in
+    # this shard waits on, so completions go back to the shard that owns it
+    ready: deque[AwaitingCoroutine[I, O]] = field(default_factory=deque)
+    deadlines: list[tuple[int, int, AwaitingCoroutine[I, O]]] = field(default_factory=list)
+
+
+@dataclass
+class _Tick:
+    time: int = 0
+    max_steps: int | None = None
+    until: int | None = None
+
+
+class Scheduler[I, O]:
+    def __init__(
+        self,
+        io: IO[I, O],
+        size: int,
+        spawn_size: int,
+        weights: Mapping[str, int] | None = None,
+        workers: int = 2,
+    ) -> None:
+        assert workers > 0, "must be at least one worker"
+
+        self._io: Final = io
+        self._size: Final = size
+        self._spawn_size: Final = spawn_size
+        self._in: Final = queue.Queue[Coroutine[I, O]](size)
+
+        self._live: int = 0
+        self._live_lock: Final = Lock()
+        self._spawned: Final = set[Coroutine[I, O]]()
+
+        self._shards: Final = [
+            _Shard[I, O](RunQueue[I, O](weights or {DEFAULT_PRIORITY: 1})) for _ in range(workers)
+        ]
+        self._seq: Final = itertools.count()
+        self._next: Final = itertools.count()
+        self._closed: bool = False
+
+        # raised on the calling thread once every shard is done with the tick,
+        # a worker that dies instead would leave the others on the barrier
+        self._errors: Final[list[Exception]] = []
+
+        # the calling thread runs shard 0, one thread per other shard runs in
+        # lockstep with it, every tick starts and ends on the barriers
+        self._tick: _Tick = _Tick()
+        self._start: Final = Barrier(workers)
+        self._end: Final = Barrier(workers)
+        self._threads: Final = [
+            Thread(target=self._worker, args=(i,), daemon=True) for i in range(1, workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def add(self, c: Coroutine[I, O]) -> bool:
+        if self._closed:
+            return False
+
+        with self._live_lock:
+            if self._live >= self._size:
+                return False
+            self._live += 1
+
+        try:
+            self._in.put_nowait(c)
+        except queue.Full:
+            self._retire(c)
+            return False
+        return True
+
+    def run_until_blocked(
+        self, time: int, max_steps: int | None = None, max_ns: int | None = None
+    ) -> None:
+        batch(self._in, self._in.qsize(), self._push)
+        self.tick(time, max_steps, max_ns)
+        assert max_steps is not None or max_ns is not None or self._runnable() == 0, (
+            "runnable should be empty"
+        )
+
+    def tick(self, time: int, max_steps: int | None = None, max_ns: int | None = None) -> None:
+        self.unblock()
+        self.expire(time)
+
+        self._tick = _Tick(
+            time,
+            None if max_steps is None else math.ceil(max_steps / len(self._shards)),
+            None if max_ns is None else perf_counter_ns() + max_ns,
+        )
+        _ = self._start.wait()
+        try:
+            self._run(0)
+        except Exception as e:
+            self._errors.append(e)
+        _ = self._end.wait()
+
+        if len(self._errors) > 0:
+            e = self._errors[0]
+            self._errors.clear()
+            raise e
+
+    def step(self, time: int) -> bool:
+        coroutine = self._take(0)
+        if coroutine is None:
+            return False
+
+        self._step(self._shards[0], coroutine, time)
+        return True
+
+    def size(self) -> int:
+        return self._runnable() + self._parked() + self._in.qsize()
+
+    def gauges(self) -> Gauges:
+        spawned = len(self._spawned)
+        return Gauges(
+            live=self._live + spawned,
+            spawned=spawned,
+            parked=self._parked(),
+            runnable=self._runnable(),
+        )
+
+    def stats(self) -> dict[str, ClassStats]:
+        stats: dict[str, ClassStats] = {}
+        for shard in self._shards:
+            for name, s in shard.runnable.stats().items():
+                total = stats.get(name)
+                stats[name] = (
+                    s
+                    if total is None
+                    else ClassStats(
+                        depth=total.depth + s.depth,
+                        steps=total.steps + s.steps,
+                        waited_ns=total.waited_ns + s.waited_ns,
+                        max_waited_ns=max(total.max_waited_ns, s.max_waited_ns),
+                    )
+                )
+        return stats
+
+    def shutdown(self) -> None:
+        self._closed = True
+        self._in.shutdown()
+        self._in.join()
+
+        # release the workers from the start barrier one last time
+        _ = self._start.wait()
+        for t in self._threads:
+            t.join()
+
+    def next_deadline(self) -> int | None:
+        deadlines: list[int] = []
+        for shard in self._shards:
+            with shard.lock:
+                while len(shard.deadlines) > 0:
+                    deadline, _, awaiting = shard.deadlines[0]
+                    if awaiting in shard.awaiting:
+                        deadlines.append(deadline)
+                        break
+                    _ = heapq.heappop(shard.deadlines)
+        return min(deadlines, default=None)
+
+    def unblock(self) -> None:
+        for shard in self._shards:
+            while True:
+                try:
+                    awaiting = shard.ready.popleft()
+                except IndexError:
+                    break
+
+                with shard.lock:
+                    # the wait may have expired before its promise completed
+                    if awaiting not in shard.awaiting:
+                        continue
+
+                    shard.awaiting.remove(awaiting)
+                    shard.runnable.append(awaiting.coroutine)
+
+    def expire(self, time: int) -> None:
+        for shard in self._shards:
+            with shard.lock:
+                while len(shard.deadlines) > 0 and shard.deadlines[0][0] <= time:
+                    _, _, awaiting = heapq.heappop(shard.deadlines)
+                    if awaiting not in shard.awaiting:
+                        continue
+
+                    shard.awaiting.remove(awaiting)
+                    awaiting.coroutine.expire()
+                    shard.runnable.append(awaiting.coroutine)
+
+    def _worker(self, i: int) -> None:
+        while True:
+            _ = self._start.wait()
+            if self._closed:
+                return
+
+            try:
+                self._run(i)
+            except Exception as e:
+                self._errors.append(e)
+            _ = self._end.wait()
+
+    def _run(self, i: int) -> None:
+        tick = self._tick
+        shard = self._shards[i]
+
+        steps = 0
+        while tick.max_steps is None or steps < tick.max_steps:
+            if tick.until is not None and perf_counter_ns() >= tick.until:
+                break
+
+            coroutine = self._take(i)
+            if coroutine is None:
+                break
+
+            self._step(shard, coroutine, tick.time)
+            steps += 1
+
+    def _take(self, i: int) -> Coroutine[I, O] | None:
+        shard = self._shards[i]
+        with shard.lock:
+            coroutine = shard.runnable.pop()
+        if coroutine is not None:
+            return coroutine
+
+        # steal half of the first victim with runnable coroutines, starting
+        # after this shard so idle shards spread over different victims
+        n = len(self._shards)
+        for j in range(1, n):
+            victim = self._shards[(i + j) % n]
+            with victim.lock:
+                stolen = victim.runnable.steal((len(victim.runnable) + 1) // 2)
+            if len(stolen) == 0:
+                continue
+
+            with shard.lock:
+                shard.runnable.adopt(stolen)
+                return shard.runnable.pop()
+
+        return None
+
+    def _step(self, shard: _Shard[I, O], coroutine: Coroutine[I, O], time: int) -> None:
+        coroutine.set_time(time)
+
+        values, promises, spawn, wait, done = coroutine.resume()
+        if len(promises) > 0:
+
+            def _(promise: Future[O], v: O | Exception) -> None:
+                match v:
+                    case Exception():
+                        promise.set_exception(v)
+                    case _:
+                        promise.set_result(v)
+
+            for value, promise in zip(values, promises, strict=True):
+                self._io.dispatch(value, lambda v, promise=promise: _(promise, v))
+
+            self._push(coroutine, shard)
+        elif spawn is not None:
+            with self._live_lock:
+                admitted = len(self._spawned) < self._spawn_size
+                if admitted:
+                    self._spawned.add(spawn)
+
+            if admitted:
+                self._push(spawn, shard)
+            else:
+                spawn.reject(SpawnLimitError(self._spawn_size))
+            self._push(coroutine, shard)
+        elif wait is not None:
+            deadline = coroutine.expires()
+            if deadline is not None and deadline <= time:
+                coroutine.expire()
+                self._push(coroutine, shard)
+                return
+
+            awaiting = AwaitingCoroutine[I, O](coroutine, wait)
+            with shard.lock:
+                shard.awaiting.add(awaiting)
+                if deadline is not None:
+                    heapq.heappush(shard.deadlines, (deadline, next(self._seq), awaiting))
+            wait.add_done_callback(lambda _, awaiting=awaiting: shard.ready.append(awaiting))
+        elif done:
+            self._retire(coroutine)
+            self.unblock()
+        else:
+            msg = "unreachable"
+            raise AssertionError(msg)
+
+    def _push(self, c: Coroutine[I, O], shard: _Shard[I, O] | None = None) -> None:
+        if shard is None:
+            shard = self._shards[next(self._next) % len(self._shards)]
+
+        with shard.lock:
+            shard.runnable.append(c)
+
+    def _retire(self, c: Coroutine[I, O]) -> None:
+        with self._live_lock:
+            if c in self._spawned:
+                self._spawned.remove(c)
+            else:
+                self._live -= 1
+
+    def _runnable(self) -> int:
+        return sum(len(shard.runnable) for shard in self._shards)
+
+    def _parked(self) -> int:
+        return sum(len(shard.awaiting) for shard in self._shards)
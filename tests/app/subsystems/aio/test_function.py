@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import concurrent.futures
+import sys
+import time
 from typing import TYPE_CHECKING
 
 import pytest
@@ -7,6 +10,9 @@ import pytest
 from pycoro import aio
 from pycoro.app.subsystems.aio import function
 from pycoro.kernel import bus, t_aio
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.status import StatusCode
+from pycoro.kernel.wakeup import Wakeup
 
 if TYPE_CHECKING:
     from collections.abc import Callable
@@ -38,3 +44,94 @@ def test_echo(test_data: str) -> None:
     # Process the SQE synchronously through the worker
     cqe = subsystem.process([sqe])[0]
     cqe.invoke()
+
+
+def _run(
+    submission: function.FunctionSubmission, mode: function.Mode = "process"
+) -> t_aio.Kind | Exception:
+    a = aio.new(100)
+    subsystem = function.new(a, function.Config(workers=1, mode=mode))
+    subsystem.start(None)
+
+    values: list[t_aio.Kind | Exception] = []
+    assert subsystem.enqueue(bus.SQE[t_aio.Kind, t_aio.Kind](values.append, submission))
+
+    wakeup = Wakeup()
+    while not values:
+        a.signal(wakeup)
+        _ = wakeup.wait(None)
+        for cqe in a.dequeue_cqe(1):
+            cqe.invoke()
+
+    subsystem.stop()
+    return values[0]
+
+
+def test_process_mode() -> None:
+    value = _run(function.FunctionSubmission(fn=pow, args=(2, 10)))
+    assert isinstance(value, function.FunctionCompletion)
+    assert value.result == 2**10
+
+
+def test_process_mode_function_raises() -> None:
+    value = _run(function.FunctionSubmission(fn=int, args=("foo",)))
+    assert isinstance(value, function.FunctionCompletion)
+    assert isinstance(value.result, ValueError)
+
+
+def test_process_mode_unpicklable() -> None:
+    value = _run(function.FunctionSubmission(fn=lambda: "foo"))
+    assert isinstance(value, Error)
+    assert value.code == StatusCode.STATUS_AIO_FUNCTION_ERROR
+
+
+def test_process_mode_completes_out_of_order() -> None:
+    a = aio.new(100)
+    subsystem = function.new(a, function.Config(workers=2, mode="process"))
+
+    # both land in the same batch, the fast one must not wait for the slow one
+    values: list[t_aio.Kind | Exception] = []
+    for submission in [
+        function.FunctionSubmission(fn=time.sleep, args=(1,)),
+        function.FunctionSubmission(fn=pow, args=(2, 10)),
+    ]:
+        assert subsystem.enqueue(bus.SQE[t_aio.Kind, t_aio.Kind](values.append, submission))
+    subsystem.start(None)
+
+    wakeup = Wakeup()
+    while len(values) < 2:  # noqa: PLR2004
+        a.signal(wakeup)
+        _ = wakeup.wait(None)
+        for cqe in a.dequeue_cqe(2):
+            cqe.invoke()
+
+    subsystem.stop()
+
+    fast, slow = values
+    assert isinstance(fast, function.FunctionCompletion)
+    assert fast.result == 2**10
+    assert isinstance(slow, function.FunctionCompletion)
+    assert slow.result is None
+
+
+def test_mode_fallback() -> None:
+    interpreter = function.new(aio.new(100), function.Config(mode="interpreter"))
+    if hasattr(concurrent.futures, "InterpreterPoolExecutor"):
+        assert interpreter.mode == "interpreter"
+    else:
+        assert interpreter.mode == "thread"
+
+    parallel = function.new(aio.new(100), function.Config(mode="parallel"))
+    if sys._is_gil_enabled():  # noqa: SLF001  # pyright: ignore[reportPrivateUsage]
+        assert parallel.mode == "thread"
+    else:
+        assert parallel.mode == "parallel"
+
+    assert function.new(aio.new(100), function.Config(mode="process")).mode == "process"
+
+
+@pytest.mark.parametrize("mode", ["interpreter", "parallel"])
+def test_parallel_modes(mode: function.Mode) -> None:
+    value = _run(function.FunctionSubmission(fn=pow, args=(2, 10)), mode)
+    assert isinstance(value, function.FunctionCompletion)
+    assert value.result == 2**10
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from pycoro import aio
+from pycoro.app.subsystems.aio import task
+from pycoro.kernel import bus, t_aio
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.status import StatusCode
+from pycoro.kernel.wakeup import Wakeup
+
+
+async def double(n: int) -> int:
+    await asyncio.sleep(0.01)
+    return 2 * n
+
+
+async def fail() -> None:
+    msg = "foo"
+    raise ValueError(msg)
+
+
+def test_task() -> None:
+    subsystem = task.new(aio.new(100), task.Config())
+
+    sqes = [
+        bus.SQE[t_aio.Kind, t_aio.Kind](
+            submission=task.TaskSubmission(fn=double, args=(21,)), callback=lambda _: None
+        ),
+        bus.SQE[t_aio.Kind, t_aio.Kind](
+            submission=task.TaskSubmission(fn=fail), callback=lambda _: None
+        ),
+    ]
+
+    ok, err = subsystem.process(sqes)
+    assert isinstance(ok.completion, task.TaskCompletion)
+    assert ok.completion.result == 2 * 21
+    assert isinstance(err.completion, task.TaskCompletion)
+    assert isinstance(err.completion.result, ValueError)
+
+
+def test_task_runs_concurrently() -> None:
+    n = 100
+    a = aio.new(n)
+    subsystem = task.new(a, task.Config(size=n))
+    subsystem.start(None)
+
+    values: list[t_aio.Kind | Exception] = []
+    for i in range(n):
+        assert subsystem.enqueue(
+            bus.SQE[t_aio.Kind, t_aio.Kind](values.append, task.TaskSubmission(double, (i,)))
+        )
+
+    # every task is in flight, there is no room for more
+    assert not subsystem.enqueue(
+        bus.SQE[t_aio.Kind, t_aio.Kind](values.append, task.TaskSubmission(double, (n,)))
+    )
+
+    wakeup = Wakeup()
+    while len(values) < n:
+        a.signal(wakeup)
+        _ = wakeup.wait(None)
+        for cqe in a.dequeue_cqe(n):
+            cqe.invoke()
+
+    subsystem.stop()
+
+    results: list[int] = []
+    for value in values:
+        assert isinstance(value, task.TaskCompletion)
+        assert isinstance(value.result, int)
+        results.append(value.result)
+    assert sorted(results) == [2 * i for i in range(n)]
+
+
+def test_task_shared_loop_overflow() -> None:
+    n = 100
+
+    async def main() -> None:
+        a = aio.new(1)
+        subsystem = task.new(a, task.Config(size=n), asyncio.get_running_loop())
+        subsystem.start(None)
+
+        values: list[t_aio.Kind | Exception] = []
+        for i in range(n):
+            assert subsystem.enqueue(
+                bus.SQE[t_aio.Kind, t_aio.Kind](values.append, task.TaskSubmission(double, (i,)))
+            )
+
+        # nothing drains the completion queue, the loop and its executor are
+        # still free for everything else
+        await asyncio.sleep(0)
+        async with asyncio.timeout(5):
+            _ = await asyncio.gather(*subsystem.tasks)
+            await asyncio.to_thread(lambda: None)
+        assert len(subsystem.overflow) == n - 1
+
+        while len(values) < n:
+            for cqe in a.dequeue_cqe(1):
+                cqe.invoke()
+            subsystem.flush(0)
+
+        results: list[int] = []
+        for value in values:
+            assert isinstance(value, task.TaskCompletion)
+            assert isinstance(value.result, int)
+            results.append(value.result)
+        assert sorted(results) == [2 * i for i in range(n)]
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("started", [False, True])
+def test_task_cancelled(*, started: bool) -> None:
+    async def main() -> None:
+        a = aio.new(100)
+        subsystem = task.new(a, task.Config(), asyncio.get_running_loop())
+        subsystem.start(None)
+
+        values: list[t_aio.Kind | Exception] = []
+        assert subsystem.enqueue(
+            bus.SQE[t_aio.Kind, t_aio.Kind](
+                values.append, task.TaskSubmission(asyncio.sleep, (10,))
+            )
+        )
+        # the task is spawned on the next iteration and starts on the one after
+        await asyncio.sleep(0)
+        if started:
+            await asyncio.sleep(0)
+
+        for t in list(subsystem.tasks):
+            _ = t.cancel()
+        _ = await asyncio.gather(*subsystem.tasks, return_exceptions=True)
+
+        for cqe in a.dequeue_cqe(1):
+            cqe.invoke()
+        assert len(values) == 1
+        assert isinstance(values[0], Error)
+        assert values[0].code == StatusCode.STATUS_AIO_TASK_ERROR
+
+    asyncio.run(main())
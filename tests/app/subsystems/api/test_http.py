@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import socket
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Literal
+
+import pytest
+
+import pycoro
+from pycoro.aio import new as new_aio
+from pycoro.api import new as new_api
+from pycoro.app.subsystems.aio import echo
+from pycoro.app.subsystems.api import http
+from pycoro.kernel import cache, system
+from pycoro.kernel.t_api.response import Response
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from pycoro.kernel.t_aio import Kind
+    from pycoro.kernel.t_api.request import Request
+
+
+@dataclass(frozen=True)
+class EchoRequest:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+@dataclass(frozen=True)
+class EchoResponse:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def is_response_payload(self) -> Literal[True]:
+        return True
+
+
+@dataclass(frozen=True)
+class OpaqueRequest:
+    def kind(self) -> str:
+        return "opaque"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+@dataclass(frozen=True)
+class OpaqueResponse:
+    data: frozenset[str]
+
+    def kind(self) -> str:
+        return "opaque"
+
+    def is_response_payload(self) -> Literal[True]:
+        return True
+
+
+def opaque_coroutine(
+    _c: pycoro.Coroutine[Kind, Kind, Any], _r: Request[OpaqueRequest]
+) -> Response[OpaqueResponse]:
+    # a perfectly good response that json cannot serialize
+    return Response(status=StatusCode.STATUS_OK, payload=OpaqueResponse(frozenset()))
+
+
+released = threading.Event()
+
+
+def echo_coroutine(
+    c: pycoro.Coroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Response[EchoResponse]:
+    match r.payload.data:
+        case "fail":
+            msg = "failed"
+            raise ValueError(msg)
+        case "stall":
+            return pycoro.wait(c, Future[Response[EchoResponse]]())
+        case "block":
+            # stuck outside of pycoro until the test lets it go
+            assert released.wait(timeout=5)
+        case _:
+            pass
+
+    completion = pycoro.emit_and_wait(c, echo.EchoSubmission(r.payload.data))
+    assert isinstance(completion, echo.EchoCompletion)
+
+    status = StatusCode.STATUS_CREATED if completion.data == "new" else StatusCode.STATUS_OK
+    return Response(status=status, payload=EchoResponse(completion.data))
+
+
+def decode(body: bytes) -> EchoRequest:
+    return EchoRequest(**json.loads(body))
+
+
+@pytest.fixture
+def addr() -> Generator[tuple[str, int]]:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+
+    server = http.new(api, http.Config(max_inflight=2, deadline=timedelta(milliseconds=100)))
+    server.route("POST", "/echo", decode)
+    server.route("POST", "/opaque", lambda _: OpaqueRequest())
+    api.add_subsystems(server)
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=10, completion_batch_size=10),
+    )
+    s.add_on_request("echo", echo_coroutine)
+    s.add_on_request(
+        "opaque", opaque_coroutine, cache=cache.Config(key=lambda _: "opaque", ttl=60_000)
+    )
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    assert server.started.wait(timeout=5)
+    host, port = api.addr().rsplit(":", 1)
+    yield host, int(port)
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+def request(method: str, path: str, body: bytes, connection: str = "keep-alive") -> bytes:
+    head = "\r\n".join(
+        (
+            f"{method} {path} HTTP/1.1",
+            f"Content-Length: {len(body)}",
+            f"Connection: {connection}",
+            "\r\n",
+        )
+    )
+    return head.encode() + body
+
+
+def read(f: Any) -> tuple[int, dict[str, str], bytes]:
+    status = int(f.readline().split(b" ")[1])
+    headers: dict[str, str] = {}
+    while (line := f.readline()) != b"\r\n":
+        name, _, value = line.decode().partition(":")
+        headers[name.lower()] = value.strip()
+    return status, headers, f.read(int(headers["content-length"]))
+
+
+def test_http_pipelining(addr: tuple[str, int]) -> None:
+    n = 10
+
+    with socket.create_connection(addr, timeout=5) as sock, sock.makefile("rb") as f:
+        # more requests than may be in flight at once, all in one write
+        sock.sendall(
+            b"".join(
+                request("POST", "/echo", json.dumps({"data": str(i)}).encode()) for i in range(n)
+            )
+        )
+
+        for i in range(n):
+            status, headers, body = read(f)
+            assert status == 200  # noqa: PLR2004
+            assert headers["connection"] == "keep-alive"
+            assert json.loads(body) == {"data": str(i)}
+
+        # the same connection is still usable
+        sock.sendall(request("POST", "/echo", b'{"data": "last"}', "close"))
+        status, headers, body = read(f)
+        assert status == 200  # noqa: PLR2004
+        assert headers["connection"] == "close"
+        assert json.loads(body) == {"data": "last"}
+        assert f.read() == b""
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "body", "expected"),
+    [
+        ("GET", "/echo", b"", 404),
+        ("POST", "/missing", b"{}", 404),
+        ("POST", "/echo", b"not json", 400),
+        ("POST", "/echo", b'{"data": "new"}', 201),
+        ("POST", "/echo", b'{"data": "fail"}', 500),
+        ("POST", "/echo", b'{"data": "stall"}', 504),
+    ],
+)
+def test_http_status(
+    addr: tuple[str, int], method: str, path: str, body: bytes, expected: int
+) -> None:
+    with socket.create_connection(addr, timeout=5) as sock, sock.makefile("rb") as f:
+        sock.sendall(request(method, path, body))
+        status, _, _ = read(f)
+        assert status == expected
+
+
+def test_http_failure_does_not_stall_pipeline(addr: tuple[str, int]) -> None:
+    with socket.create_connection(addr, timeout=5) as sock, sock.makefile("rb") as f:
+        sock.sendall(
+            request("POST", "/echo", b'{"data": "fail"}')
+            + request("POST", "/echo", b'{"data": "foo"}')
+        )
+
+        status, _, _ = read(f)
+        assert status == 500  # noqa: PLR2004
+
+        status, _, body = read(f)
+        assert status == 200  # noqa: PLR2004
+        assert json.loads(body) == {"data": "foo"}
+
+
+def test_http_blocked_handler_times_out(addr: tuple[str, int]) -> None:
+    released.clear()
+    with socket.create_connection(addr, timeout=5) as sock, sock.makefile("rb") as f:
+        sock.sendall(request("POST", "/echo", b'{"data": "block"}'))
+
+        # answered while the handler is still blocked
+        status, _, _ = read(f)
+        assert status == 504  # noqa: PLR2004
+        released.set()
+
+        # and the connection carries on
+        sock.sendall(request("POST", "/echo", b'{"data": "foo"}'))
+        status, _, body = read(f)
+        assert status == 200  # noqa: PLR2004
+        assert json.loads(body) == {"data": "foo"}
+
+
+def test_http_unserializable_response(addr: tuple[str, int]) -> None:
+    with socket.create_connection(addr, timeout=5) as sock, sock.makefile("rb") as f:
+        # the second one is a cache hit, answered on the system loop thread
+        for _ in range(2):
+            sock.sendall(request("POST", "/opaque", b""))
+            status, _, _ = read(f)
+            assert status == 500  # noqa: PLR2004
+
+        sock.sendall(request("POST", "/echo", b'{"data": "foo"}'))
+        status, _, body = read(f)
+        assert status == 200  # noqa: PLR2004
+        assert json.loads(body) == {"data": "foo"}
+
+
+def test_http_stop_without_serving() -> None:
+    api = new_api(100)
+
+    # never started
+    http.new(api, http.Config()).stop()
+
+    # the port is taken, start fails and stop has nothing to wait for
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+
+        server = http.new(api, http.Config(port=taken.getsockname()[1]))
+        with pytest.raises(OSError, match="address already in use"):
+            server.start()
+
+        assert server.started.is_set()
+        assert server.addr() == ""
+        server.stop()
+
+    # stopped before it got to serve, it stops as soon as it does
+    server = http.new(api, http.Config())
+    server.stop()
+    t = threading.Thread(target=server.start, daemon=True)
+    t.start()
+    t.join(timeout=5)
+    assert not t.is_alive()
@@ -1,12 +1,19 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Final
+
+import pytest
 
 import pycoro
-from pycoro import aio
+from pycoro import aio, stealing
 from pycoro.app.subsystems.aio import echo, function
+from pycoro.scheduler import DEFAULT_PRIORITY, Gauges, SpawnLimitError
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
     from pycoro.kernel import t_aio
 
 
@@ -65,7 +72,56 @@ def echo_coroutine(n: int) -> pycoro.CoroutineFunc[t_aio.Kind, t_aio.Kind, str]:
     return _
 
 
-def test_system() -> None:
+def generator_echo_coroutine(n: int) -> pycoro.GeneratorFunc[t_aio.Kind, t_aio.Kind, str]:
+    def _(
+        c: pycoro.GeneratorCoroutine[t_aio.Kind, t_aio.Kind, str],
+    ) -> Generator[Any, Any, str]:
+        if n == 0:
+            return ""
+
+        foo_future = yield pycoro.emit(c, echo.EchoSubmission(f"foo.{n}"))
+        bar_future = yield pycoro.emit(c, echo.EchoSubmission(f"bar.{n}"))
+        baz = yield pycoro.spawn_and_wait(c, generator_echo_coroutine(n - 1))
+
+        foo_completion = yield pycoro.wait(c, foo_future)
+        assert isinstance(foo_completion, echo.EchoCompletion)
+        foo = foo_completion.data
+
+        bar_completion = yield pycoro.wait(c, bar_future)
+        assert isinstance(bar_completion, echo.EchoCompletion)
+        bar = bar_completion.data
+
+        return f"{foo}:{bar}:{baz}"
+
+    return _
+
+
+def async_echo_coroutine(n: int) -> pycoro.AsyncFunc[t_aio.Kind, t_aio.Kind, str]:
+    async def _(
+        c: pycoro.AsyncCoroutine[t_aio.Kind, t_aio.Kind, str],
+    ) -> str:
+        if n == 0:
+            return ""
+
+        foo_future = await pycoro.emit(c, echo.EchoSubmission(f"foo.{n}"))
+        bar_future = await pycoro.emit(c, echo.EchoSubmission(f"bar.{n}"))
+        baz = await pycoro.spawn_and_wait(c, async_echo_coroutine(n - 1))
+
+        foo_completion = await pycoro.wait(c, foo_future)
+        assert isinstance(foo_completion, echo.EchoCompletion)
+        foo = foo_completion.data
+
+        bar_completion = await pycoro.wait(c, bar_future)
+        assert isinstance(bar_completion, echo.EchoCompletion)
+        bar = bar_completion.data
+
+        return f"{foo}:{bar}:{baz}"
+
+    return _
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_system(workers: int) -> None:
     # Instantiate IO
     io = aio.new(100)
     io.add_subsystem(echo.new(io, echo.Config()))
@@ -73,7 +129,7 @@ def test_system() -> None:
     io.start()
 
     # Instantiate scheduler
-    scheduler = pycoro.Scheduler(io, 100)
+    scheduler = pycoro.Scheduler(io, 100, workers=workers)
 
     # Add coroutine to scheduler
     echo_promise = pycoro.add(scheduler, echo_coroutine(5))
@@ -95,3 +151,349 @@ def test_system() -> None:
 
     # Await and check final result
     assert echo_promise.result() == function_promise.result()
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("coroutine", [generator_echo_coroutine, async_echo_coroutine])
+def test_cooperative_system(coroutine: Callable[[int], Any], workers: int) -> None:
+    io = aio.new(100)
+    io.add_subsystem(echo.new(io, echo.Config()))
+    io.start()
+
+    scheduler = pycoro.Scheduler(io, 100, workers=workers)
+
+    # cooperative and thread coroutines share the same scheduler
+    cooperative_promise = pycoro.add(scheduler, coroutine(5))
+    thread_promise = pycoro.add(scheduler, echo_coroutine(5))
+    assert cooperative_promise is not None
+    assert thread_promise is not None
+
+    i = 0
+    while scheduler.size() > 0:
+        for cqe in io.dequeue_cqe(3):
+            cqe.invoke()
+        scheduler.run_until_blocked(i)
+        i += 1
+
+    io.shutdown()
+    scheduler.shutdown()
+
+    assert cooperative_promise.result() == thread_promise.result()
+
+
+def timeout_coroutine(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, str]) -> str:
+    try:
+        _ = pycoro.wait(c, Future[Any](), timeout_ms=10)
+    except TimeoutError:
+        return f"timeout at {c.time()}"
+    return "completed"
+
+
+def generator_timeout_coroutine(
+    c: pycoro.GeneratorCoroutine[t_aio.Kind, t_aio.Kind, str],
+) -> Generator[Any, Any, str]:
+    try:
+        _ = yield pycoro.wait(c, Future[Any](), timeout_ms=10)
+    except TimeoutError:
+        return f"timeout at {c.time()}"
+    return "completed"
+
+
+async def async_timeout_coroutine(c: pycoro.AsyncCoroutine[t_aio.Kind, t_aio.Kind, str]) -> str:
+    try:
+        _ = await pycoro.wait(c, Future[Any](), timeout_ms=10)
+    except TimeoutError:
+        return f"timeout at {c.time()}"
+    return "completed"
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize(
+    "coroutine", [timeout_coroutine, generator_timeout_coroutine, async_timeout_coroutine]
+)
+def test_wait_timeout(coroutine: Any, workers: int) -> None:
+    io = aio.new(100)
+    scheduler = pycoro.Scheduler(io, 100, workers=workers)
+
+    promise = pycoro.add(scheduler, coroutine)
+    assert promise is not None
+
+    for i in range(20):
+        scheduler.run_until_blocked(i)
+
+    assert scheduler.size() == 0
+    assert scheduler.next_deadline() is None
+    scheduler.shutdown()
+
+    assert promise.result() == "timeout at 10"
+
+
+def test_deadline_propagates_to_spawned_coroutines() -> None:
+    io = aio.new(100)
+    scheduler = pycoro.Scheduler(io, 100)
+    deadlines: list[int | None] = []
+
+    def child(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, str]) -> str:
+        deadlines.append(c.deadline())
+        return pycoro.wait(c, Future[str]())
+
+    def parent(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, str]) -> str:
+        deadlines.append(c.deadline())
+        return pycoro.spawn_and_wait(c, child)
+
+    deadline = 5
+    promise = pycoro.add(scheduler, parent, deadline=deadline)
+    assert promise is not None
+
+    for i in range(10):
+        scheduler.run_until_blocked(i)
+        if i < deadline:
+            assert scheduler.next_deadline() == deadline
+
+    assert scheduler.size() == 0
+    scheduler.shutdown()
+
+    assert deadlines == [deadline, deadline]
+    assert isinstance(promise.exception(), TimeoutError)
+
+
+def spawning_coroutine(n: int) -> pycoro.CoroutineFunc[t_aio.Kind, t_aio.Kind, int]:
+    def _(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, int]) -> int:
+        if n == 0:
+            return 0
+        return pycoro.spawn_and_wait(c, spawning_coroutine(n - 1)) + 1
+
+    return _
+
+
+def test_admission_counts_live_coroutines() -> None:
+    io = aio.new(100)
+    scheduler = pycoro.Scheduler(io, 2)
+    p = Future[int]()
+
+    def parked(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, int]) -> int:
+        return pycoro.wait(c, p)
+
+    assert pycoro.add(scheduler, parked) is not None
+    assert pycoro.add(scheduler, parked) is not None
+    assert pycoro.add(scheduler, parked) is None
+
+    # admitted coroutines hold their slot until they are done, not until they
+    # leave the queue
+    scheduler.run_until_blocked(0)
+    assert scheduler.gauges() == Gauges(live=2, spawned=0, parked=2, runnable=0)
+    assert pycoro.add(scheduler, parked) is None
+
+    p.set_result(1)
+    scheduler.run_until_blocked(1)
+    assert scheduler.gauges() == Gauges(live=0, spawned=0, parked=0, runnable=0)
+    assert pycoro.add(scheduler, parked) is not None
+
+    scheduler.run_until_blocked(2)
+    scheduler.shutdown()
+
+
+def test_spawn_limit() -> None:
+    io = aio.new(100)
+    scheduler = pycoro.Scheduler(io, 1, spawn_size=2)
+
+    promise = pycoro.add(scheduler, spawning_coroutine(5))
+    assert promise is not None
+    assert scheduler.gauges().live == 1
+
+    scheduler.run_until_blocked(0)
+    assert scheduler.gauges() == Gauges(live=0, spawned=0, parked=0, runnable=0)
+    scheduler.shutdown()
+
+    assert isinstance(promise.exception(), SpawnLimitError)
+
+
+def fan_out_coroutine(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, list[str]]) -> list[str]:
+    ps = pycoro.emit_many(c, [echo.EchoSubmission(str(i)) for i in range(10)])
+    assert pycoro.wait_any(c, ps).done()
+
+    completions = pycoro.wait_all(c, ps)
+    children = pycoro.map(c, echo_coroutine, [1, 2, 3], concurrency=2)
+    return [
+        completion.data for completion in completions if isinstance(completion, echo.EchoCompletion)
+    ] + children
+
+
+def generator_fan_out_coroutine(
+    c: pycoro.GeneratorCoroutine[t_aio.Kind, t_aio.Kind, list[str]],
+) -> Generator[Any, Any, list[str]]:
+    ps = yield pycoro.emit_many(c, [echo.EchoSubmission(str(i)) for i in range(10)])
+    first = yield pycoro.wait_any(c, ps)
+    assert first.done()
+
+    completions = yield pycoro.wait_all(c, ps)
+    children = yield pycoro.map(c, generator_echo_coroutine, [1, 2, 3], concurrency=2)
+    return [completion.data for completion in completions] + children
+
+
+async def async_fan_out_coroutine(
+    c: pycoro.AsyncCoroutine[t_aio.Kind, t_aio.Kind, list[str]],
+) -> list[str]:
+    ps = await pycoro.emit_many(c, [echo.EchoSubmission(str(i)) for i in range(10)])
+    assert (await pycoro.wait_any(c, ps)).done()
+
+    completions = await pycoro.wait_all(c, ps)
+    children = await pycoro.map(c, async_echo_coroutine, [1, 2, 3], concurrency=2)
+    return [
+        completion.data for completion in completions if isinstance(completion, echo.EchoCompletion)
+    ] + children
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize(
+    "coroutine", [fan_out_coroutine, generator_fan_out_coroutine, async_fan_out_coroutine]
+)
+def test_fan_out(coroutine: Any, workers: int) -> None:
+    io = aio.new(100)
+    io.add_subsystem(echo.new(io, echo.Config()))
+    io.start()
+
+    scheduler = pycoro.Scheduler(io, 100, workers=workers)
+    promise = pycoro.add(scheduler, coroutine)
+    assert promise is not None
+
+    i = 0
+    while scheduler.size() > 0:
+        for cqe in io.dequeue_cqe(100):
+            cqe.invoke()
+        scheduler.run_until_blocked(i)
+        i += 1
+
+    io.shutdown()
+    scheduler.shutdown()
+
+    assert promise.result() == [
+        *(str(i) for i in range(10)),
+        "foo.1:bar.1:",
+        "foo.2:bar.2:foo.1:bar.1:",
+        "foo.3:bar.3:foo.2:bar.2:foo.1:bar.1:",
+    ]
+
+
+def test_weighted_fair_scheduling() -> None:
+    io = aio.new(100)
+    scheduler = pycoro.Scheduler(io, 100, weights={"interactive": 3, "bulk": 1})
+    order: list[str] = []
+
+    def coroutine(priority: str) -> pycoro.CoroutineFunc[t_aio.Kind, t_aio.Kind, None]:
+        def _(c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, None]) -> None:
+            assert c.priority() == priority
+            order.append(priority)
+
+        return _
+
+    for priority in ["bulk"] * 8 + ["interactive"] * 3:
+        assert pycoro.add(scheduler, coroutine(priority), priority=priority) is not None
+    scheduler.run_until_blocked(0)
+    scheduler.shutdown()
+
+    # bulk gets one step per round, interactive three
+    assert order == ["bulk", *["interactive"] * 3, *["bulk"] * 7]
+
+    stats = scheduler.stats()
+    assert stats["interactive"].steps == order.count("interactive")
+    assert stats["bulk"].depth == 0
+
+
+def test_stolen_coroutines_are_counted_once() -> None:
+    io = aio.new(100)
+    n = 100
+    scheduler = pycoro.Scheduler(io, n, workers=4)
+
+    steps = 0
+
+    def coroutine(_c: pycoro.Coroutine[t_aio.Kind, t_aio.Kind, None]) -> None:
+        nonlocal steps
+        steps += 1
+
+    # shards that run out steal from the others, moving a coroutine is not a step
+    for _ in range(3):
+        promises = [pycoro.add(scheduler, coroutine) for _ in range(n)]
+        scheduler.run_until_blocked(0)
+        assert all(p is not None and p.done() for p in promises)
+    scheduler.shutdown()
+
+    assert sum(s.steps for s in scheduler.stats().values()) == steps
+
+
+class _Resumable:
+    def __init__(self, error: Exception | None) -> None:
+        self.error: Final = error
+
+    def resume(
+        self,
+    ) -> tuple[
+        tuple[t_aio.Kind, ...],
+        tuple[Future[t_aio.Kind], ...],
+        _Resumable | None,
+        Future[Any] | None,
+        bool,
+    ]:
+        if self.error is not None:
+            raise self.error
+        return (), (), None, None, True
+
+    def set_time(self, time: int) -> None: ...  # pyright: ignore[reportUnusedParameter]
+    def expires(self) -> int | None:
+        return None
+
+    def expire(self) -> None: ...
+    def reject(self, e: Exception) -> None: ...  # pyright: ignore[reportUnusedParameter]
+    def priority(self) -> str:
+        return DEFAULT_PRIORITY
+
+
+def test_shard_error_reaches_caller() -> None:
+    scheduler: stealing.Scheduler[t_aio.Kind, t_aio.Kind] = stealing.Scheduler(
+        aio.new(100), 100, 100, workers=2
+    )
+
+    # shards are filled round robin, the failing coroutine lands on shard 1
+    assert scheduler.add(_Resumable(None))
+    assert scheduler.add(_Resumable(RuntimeError("foo")))
+
+    errors: list[Exception] = []
+
+    def run() -> None:
+        try:
+            scheduler.run_until_blocked(0)
+        except RuntimeError as e:
+            errors.append(e)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(timeout=5)
+    assert not t.is_alive()
+    assert [str(e) for e in errors] == ["foo"]
+
+    # the workers are still around for the next tick
+    assert scheduler.add(_Resumable(None))
+    scheduler.run_until_blocked(1)
+    scheduler.shutdown()
+
+
+def test_tick_budget() -> None:
+    io = aio.new(100)
+    scheduler = pycoro.Scheduler(io, 100)
+    n = 10
+
+    promises = [pycoro.add(scheduler, spawning_coroutine(0)) for _ in range(n)]
+
+    # a time budget that has already run out does not step anything
+    scheduler.run_until_blocked(0, max_ns=0)
+    assert scheduler.gauges().runnable == n
+
+    steps = 3
+    scheduler.tick(1, max_steps=steps)
+    assert scheduler.gauges().runnable == n - steps
+
+    scheduler.tick(2)
+    assert scheduler.gauges().runnable == 0
+    scheduler.shutdown()
+
+    assert all(p is not None and p.result() == 0 for p in promises)
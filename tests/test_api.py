@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Literal, override
+
+from pycoro.api import Config, new, ratelimit
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.t_api.error import Error
+from pycoro.kernel.t_api.request import Request
+from pycoro.kernel.t_api.response import Response
+from pycoro.kernel.t_api.status import StatusCode
+
+
+@dataclass(frozen=True)
+class EchoRequest:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+def sqe(
+    received: list[Response[Any] | Exception], deadline: int | None = None
+) -> SQE[Request[Any], Response[Any]]:
+    return SQE[Request[Any], Response[Any]](
+        submission=Request(payload=EchoRequest(data="foo"), deadline=deadline),
+        callback=received.append,
+    )
+
+
+def now() -> int:
+    return int(time.time() * 1000)
+
+
+def assert_shed(received: list[Response[Any] | Exception], code: StatusCode) -> None:
+    assert len(received) == 1
+    assert isinstance(received[0], Error)
+    assert received[0].code == code
+
+
+def test_api_rejects_expired() -> None:
+    api = new(100)
+
+    received: list[Response[Any] | Exception] = []
+    api.enqueue_sqe(sqe(received, now() - 1))
+    assert_shed(received, StatusCode.STATUS_REQUEST_TIMEOUT)
+    assert api.depth() == 0
+    assert api.shed["echo"].rejected == 1
+
+
+def test_api_discards_expired() -> None:
+    api = new(100)
+
+    received: list[Response[Any] | Exception] = []
+    api.enqueue_sqe(sqe(received, now() + 10))
+    api.enqueue_sqe(sqe(received))
+    time.sleep(0.02)
+
+    assert len(api.dequeue_sqe(10)) == 1
+    assert_shed(received, StatusCode.STATUS_REQUEST_TIMEOUT)
+    assert api.shed["echo"].expired == 1
+
+
+def test_api_rejects_unmeetable_deadline() -> None:
+    api = new(100)
+
+    received: list[Response[Any] | Exception] = []
+    for _ in range(10):
+        api.enqueue_sqe(sqe(received))
+
+    # at most one submission every 10ms, the ones left wait at least 70ms
+    for _ in range(3):
+        assert len(api.dequeue_sqe(1)) == 1
+        time.sleep(0.01)
+    assert api.rate > 0
+
+    api.enqueue_sqe(sqe(received, now() + 20))
+    assert_shed(received, StatusCode.STATUS_REQUEST_TIMEOUT)
+    assert api.shed["echo"].rejected == 1
+
+    # without a deadline submissions are still admitted
+    api.enqueue_sqe(sqe(received))
+    assert len(received) == 1
+
+
+def test_api_codel() -> None:
+    api = new(
+        100,
+        Config(codel_target=timedelta(milliseconds=1), codel_interval=timedelta(milliseconds=10)),
+    )
+
+    received: list[Response[Any] | Exception] = []
+    for _ in range(10):
+        api.enqueue_sqe(sqe(received))
+
+    # above the target for less than an interval, nothing is dropped
+    time.sleep(0.02)
+    assert len(api.dequeue_sqe(1)) == 1
+    assert len(received) == 0
+
+    # above the target for a whole interval, one is dropped
+    time.sleep(0.02)
+    assert len(api.dequeue_sqe(1)) == 1
+    assert_shed(received, StatusCode.STATUS_API_OVERLOADED)
+    assert api.shed["echo"].dropped == 1
+
+
+class InvalidRequest(EchoRequest):
+    @override
+    def validate(self) -> None:
+        msg = "invalid"
+        raise ValueError(msg)
+
+
+def test_api_enqueue_sqes() -> None:
+    size = 4
+    api = new(size)
+
+    received: list[Response[Any] | Exception] = []
+    invalid = SQE[Request[Any], Response[Any]](
+        submission=Request(payload=InvalidRequest(data="foo")), callback=received.append
+    )
+
+    # invalid submissions are rejected on their own
+    valid = [sqe(received), sqe(received), sqe(received)]
+    assert api.enqueue_sqes([valid[0], invalid, *valid[1:]]) == len(valid)
+    assert len(received) == 1
+    assert isinstance(received[0], Error)
+    assert received[0].code == StatusCode.STATUS_FIELD_VALIDATION_ERROR
+
+    # atomic batches are all or nothing
+    received.clear()
+    batch = [sqe(received), sqe(received)]
+    assert api.enqueue_sqes(batch, atomic=True) == 0
+    assert len(received) == len(batch)
+    assert all(
+        isinstance(res, Error) and res.code == StatusCode.STATUS_API_SUBMISSION_QUEUE_FULL
+        for res in received
+    )
+
+    # otherwise as many as there is room for
+    received.clear()
+    assert api.enqueue_sqes(batch) == 1
+    assert len(received) == 1
+    assert api.depth() == size
+    assert len(api.dequeue_sqe(10)) == size
+
+
+def test_api_rate_limit() -> None:
+    burst = 2
+    api = new(
+        100,
+        Config(rate_limit=ratelimit.Config(key=lambda p: p.data, rate=0.001, burst=burst)),
+    )
+
+    received: list[Response[Any] | Exception] = []
+    for _ in range(burst + 1):
+        api.enqueue_sqe(sqe(received))
+    assert api.depth() == burst
+    assert_shed(received, StatusCode.STATUS_API_RATE_LIMITED)
+
+    assert api.limiter is not None
+    assert api.limiter.rejected("foo") == 1
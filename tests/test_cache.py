@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Literal
+
+import pytest
+
+from pycoro.kernel.cache import Config, new
+from pycoro.kernel.t_api.response import Response
+from pycoro.kernel.t_api.status import StatusCode
+
+
+@dataclass(frozen=True)
+class EchoResponse:
+    data: str
+
+    def kind(self) -> str:
+        return "echo"
+
+    def is_response_payload(self) -> Literal[True]:
+        return True
+
+
+def response(data: str) -> Response[EchoResponse]:
+    return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(data))
+
+
+def test_cache_ttl() -> None:
+    ttl = 10
+    cache = new(Config(key=str, ttl=ttl))
+
+    cache.put("foo", response("foo"), 0)
+    assert cache.get("foo", ttl - 1) == response("foo")
+    assert cache.get("foo", ttl) is None
+    assert cache.size() == 0
+
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+    assert cache.stats.expirations == 1
+
+
+def test_cache_lru() -> None:
+    cache = new(Config(key=str, ttl=10, max_entries=2))
+
+    cache.put("foo", response("foo"), 0)
+    cache.put("bar", response("bar"), 0)
+    assert cache.get("foo", 0) is not None
+
+    cache.put("baz", response("baz"), 0)
+    assert cache.get("bar", 0) is None
+    assert cache.get("foo", 0) is not None
+    assert cache.get("baz", 0) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_cache_lfu() -> None:
+    cache = new(Config(key=str, ttl=10, max_entries=2, eviction="lfu"))
+
+    cache.put("foo", response("foo"), 0)
+    cache.put("bar", response("bar"), 0)
+    for _ in range(3):
+        assert cache.get("foo", 0) is not None
+    assert cache.get("bar", 0) is not None
+
+    # bar was used more recently but less often than foo
+    cache.put("baz", response("baz"), 0)
+    assert cache.get("bar", 0) is None
+    assert cache.get("foo", 0) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_cache_max_bytes() -> None:
+    size = 10
+    entries = 2
+    cache = new(Config(key=str, ttl=10, max_bytes=entries * size, sizeof=lambda _: size))
+
+    for data in ["foo", "bar", "baz"]:
+        cache.put(data, response(data), 0)
+    assert cache.size() == entries
+    assert cache.stats.evictions == 1
+
+    # responses larger than the cache are never stored
+    large = new(Config(key=str, ttl=10, max_bytes=size - 1, sizeof=lambda _: size))
+    large.put("foo", response("foo"), 0)
+    assert large.size() == 0
+
+    # getsizeof does not see the payload, max bytes needs a real sizeof
+    with pytest.raises(AssertionError, match="max bytes requires sizeof"):
+        _ = new(Config(key=str, ttl=10, max_bytes=size))
+
+
+def test_cache_invalidate() -> None:
+    cache = new(Config(key=str, ttl=10))
+
+    cache.put("foo", response("foo"), 0)
+    assert cache.invalidate("foo")
+    assert not cache.invalidate("foo")
+    assert cache.get("foo", 0) is None
+    assert cache.stats.invalidations == 1
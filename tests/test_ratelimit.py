@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+
+from pycoro.api.ratelimit import Algorithm, Config, new
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "gcra"])
+def test_ratelimit_burst(algorithm: Algorithm) -> None:
+    burst = 3
+    limiter = new(Config(key=str, rate=10, burst=burst, algorithm=algorithm))
+
+    # a full burst goes through at once, then one every 100ms
+    ms = 1_000_000
+    assert all(limiter.allow("foo", 0) for _ in range(burst))
+    assert not limiter.allow("foo", 0)
+    assert not limiter.allow("foo", 50 * ms)
+    assert limiter.allow("foo", 100 * ms)
+    assert not limiter.allow("foo", 100 * ms)
+
+    # tenants do not share a limit
+    assert limiter.allow("bar", 100 * ms)
+
+    rejected = 3
+    assert limiter.rejected("foo") == rejected
+    assert limiter.rejected("bar") == 0
+    assert limiter.stats.allowed == burst + 2
+    assert limiter.stats.rejected == rejected
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "gcra"])
+def test_ratelimit_bounded(algorithm: Algorithm) -> None:
+    max_keys = 10
+    limiter = new(Config(key=str, rate=1, burst=1, algorithm=algorithm, max_keys=max_keys))
+
+    for i in range(100):
+        assert limiter.allow(i, 0)
+    assert limiter.size() == max_keys
+    assert limiter.stats.evicted == 100 - max_keys
+
+    # idle tenants back to a full burst expire rather than being evicted
+    assert limiter.allow("foo", 10_000_000_000)
+    assert limiter.size() == max_keys - 1
+    assert limiter.stats.evicted == 100 - max_keys
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+from queue import ShutDown
+
+import pytest
+
+from pycoro.kernel.ring import Ring
+from pycoro.kernel.wakeup import Wakeup
+
+
+def test_ring_bounded() -> None:
+    size = 4
+    ring = Ring[int](size)
+
+    for i in range(size):
+        assert ring.put_nowait(i)
+    assert not ring.put_nowait(size)
+    assert ring.qsize() == size
+
+    assert ring.pop(size - 1) == list(range(size - 1))
+    assert ring.pop(size) == [size - 1]
+    assert ring.pop(size) == []
+
+
+def test_ring_put_many() -> None:
+    size = 4
+    ring = Ring[int](size)
+
+    assert ring.put_many([0, 1, 2]) == len([0, 1, 2])
+    assert ring.put_many([3, 4], atomic=True) == 0
+    assert ring.put_many([3, 4]) == 1
+    assert ring.pop(size) == list(range(size))
+
+
+def test_ring_producers() -> None:
+    producers = 4
+    n = 1_000
+    ring = Ring[int](producers * n)
+
+    def produce(p: int) -> None:
+        for i in range(n):
+            assert ring.put_nowait(p * n + i)
+
+    threads = [threading.Thread(target=produce, args=(p,)) for p in range(producers)]
+    for t in threads:
+        t.start()
+
+    items = [ring.get() for _ in range(producers * n)]
+    for t in threads:
+        t.join()
+
+    # every item arrives once, each producer's in the order it put them
+    assert sorted(items) == list(range(producers * n))
+    for p in range(producers):
+        produced = [i for i in items if i // n == p]
+        assert produced == sorted(produced)
+
+
+def test_ring_shutdown() -> None:
+    ring = Ring[int](4)
+    assert ring.put_nowait(0)
+
+    got: list[int] = []
+
+    def consume() -> None:
+        while True:
+            try:
+                got.append(ring.get())
+            except ShutDown:
+                return
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    ring.shutdown()
+    consumer.join(timeout=5)
+
+    # queued items are drained before get raises
+    assert not consumer.is_alive()
+    assert got == [0]
+
+    with pytest.raises(ShutDown):
+        _ = ring.put_nowait(1)
+
+
+def test_ring_signal() -> None:
+    ring = Ring[int](4)
+    wakeup = Wakeup()
+
+    ring.signal(wakeup)
+    assert not wakeup.wait(0)
+
+    assert ring.put_nowait(0)
+    assert wakeup.wait(0)
+
+    # already queued items signal immediately
+    ring.signal(wakeup)
+    assert wakeup.wait(0)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import queue
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Literal
+
+import pycoro
+from pycoro.aio import new as new_aio
+from pycoro.api import new as new_api
+from pycoro.app.subsystems.aio import echo
+from pycoro.kernel import shard, system
+from pycoro.kernel.bus import SQE
+from pycoro.kernel.t_api.request import Request
+from pycoro.kernel.t_api.response import Response
+from pycoro.kernel.t_api.status import StatusCode
+
+if TYPE_CHECKING:
+    from collections.abc import Generator
+
+    from pycoro.kernel.t_aio import Kind
+
+
+@dataclass(frozen=True)
+class EchoRequest:
+    data: str
+    key: int = 0
+
+    def kind(self) -> str:
+        return "echo"
+
+    def validate(self) -> None:
+        return
+
+    def is_request_payload(self) -> Literal[True]:
+        return True
+
+
+@dataclass(frozen=True)
+class EchoResponse:
+    data: str
+    pid: int
+
+    def kind(self) -> str:
+        return "echo"
+
+    def is_response_payload(self) -> Literal[True]:
+        return True
+
+
+def echo_coroutine(
+    c: pycoro.GeneratorCoroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Generator[Any, Any, Response[EchoResponse]]:
+    completion = yield pycoro.emit_and_wait(c, echo.EchoSubmission(r.payload.data))
+    assert isinstance(completion, echo.EchoCompletion)
+
+    return Response(StatusCode.STATUS_OK, EchoResponse(completion.data, os.getpid()))
+
+
+def build() -> shard.System:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config()))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=10, completion_batch_size=10),
+    )
+    s.add_on_request("echo", echo_coroutine)
+    return s
+
+
+def run(config: shard.Config, reqs: list[EchoRequest]) -> list[Response[EchoResponse]]:
+    s = shard.new(build, config)
+    s.start()
+
+    received = queue.Queue[tuple[int, Response[EchoResponse] | Exception]]()
+    for i, req in enumerate(reqs):
+        s.enqueue_sqe(
+            SQE[Request[Any], Response[Any]](
+                submission=Request(payload=req),
+                callback=lambda res, i=i: received.put((i, res)),
+            )
+        )
+
+    responses: dict[int, Response[EchoResponse]] = {}
+    for _ in reqs:
+        i, res = received.get(timeout=30)
+        assert not isinstance(res, Exception)
+        responses[i] = res
+
+    s.shutdown()
+    return [responses[i] for i in range(len(reqs))]
+
+
+def test_round_robin() -> None:
+    shards = 2
+    reqs = [EchoRequest(str(i)) for i in range(20)]
+    responses = run(shard.Config(shards=shards), reqs)
+
+    assert [res.payload.data for res in responses] == [req.data for req in reqs]
+    assert len({res.payload.pid for res in responses}) == shards
+
+
+def test_shard_key() -> None:
+    reqs = [EchoRequest(str(i), key=i % 3) for i in range(30)]
+    responses = run(shard.Config(shards=2, key=lambda r: r.payload.key), reqs)
+
+    pids: dict[int, set[int]] = {}
+    for req, res in zip(reqs, responses, strict=True):
+        assert res.payload.data == req.data
+        pids.setdefault(req.key, set()).add(res.payload.pid)
+
+    assert all(len(p) == 1 for p in pids.values())
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import queue
+import threading
+import time
+from concurrent.futures import Future
 from dataclasses import dataclass
+from datetime import timedelta
 from functools import partial
 from typing import TYPE_CHECKING, Any, Literal
 
+import pytest
+
 import pycoro
 from pycoro.aio import new as new_aio
 from pycoro.api import new as new_api
-from pycoro.app.subsystems.aio import echo
-from pycoro.kernel import system
+from pycoro.app.subsystems.aio import echo, task
+from pycoro.kernel import cache, system
 from pycoro.kernel.bus import SQE
 from pycoro.kernel.t_api.error import Error
 from pycoro.kernel.t_api.request import Request
@@ -17,6 +24,8 @@ from pycoro.kernel.t_api.response import Response
 from pycoro.kernel.t_api.status import StatusCode
 
 if TYPE_CHECKING:
+    from collections.abc import Callable, Generator
+
     from pycoro.kernel.t_aio import Kind
 
 
@@ -56,7 +65,32 @@ def echo_coroutine(
     return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(completion.data))
 
 
-def test_system_loop() -> None:
+def generator_echo_coroutine(
+    c: pycoro.GeneratorCoroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Generator[Any, Any, Response[EchoResponse]]:
+    req = r.payload
+
+    completion = yield pycoro.emit_and_wait(c, echo.EchoSubmission(req.data))
+    assert isinstance(completion, echo.EchoCompletion)
+
+    return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(completion.data))
+
+
+async def async_echo_coroutine(
+    c: pycoro.AsyncCoroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Response[EchoResponse]:
+    req = r.payload
+
+    completion = await pycoro.emit_and_wait(c, echo.EchoSubmission(req.data))
+    assert isinstance(completion, echo.EchoCompletion)
+
+    return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(completion.data))
+
+
+@pytest.mark.parametrize(
+    "coroutine", [echo_coroutine, generator_echo_coroutine, async_echo_coroutine]
+)
+def test_system_loop(coroutine: Any) -> None:
     aio = new_aio(100)
     api = new_api(100)
     aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
@@ -68,7 +102,7 @@ def test_system_loop() -> None:
         aio,
         system.Config(coroutine_max_size=100, submission_batch_size=1, completion_batch_size=1),
     )
-    s.add_on_request("echo", echo_coroutine)
+    s.add_on_request("echo", coroutine)
 
     received = queue.Queue[int](10)
 
@@ -109,3 +143,559 @@ def test_system_loop() -> None:
         _ = received.get()
 
     assert received.qsize() == 0
+
+
+@pytest.mark.parametrize("scheduler_workers", [1, 4])
+@pytest.mark.parametrize("tick_max_steps", [None, 1])
+def test_system_loop_wakes_on_submission(
+    tick_max_steps: int | None, scheduler_workers: int
+) -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+    api.start()
+    aio.start()
+
+    # without a signal timeout the loop only wakes up when notified, or goes
+    # around again while a tick leaves coroutines runnable
+    s = system.new(
+        api,
+        aio,
+        system.Config(
+            coroutine_max_size=100,
+            submission_batch_size=1,
+            completion_batch_size=1,
+            tick_max_steps=tick_max_steps,
+            scheduler_workers=scheduler_workers,
+        ),
+    )
+    s.add_on_request("echo", echo_coroutine)
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    received = queue.Queue[Response[EchoResponse] | Exception]()
+    for i in range(5):
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data=str(i))),
+                callback=received.put,
+            )
+        )
+
+    for _ in range(5):
+        res = received.get(timeout=5)
+        assert not isinstance(res, Exception)
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+def failing_coroutine(c: pycoro.Coroutine[Kind, Kind, Any], r: Request[EchoRequest]) -> Any:
+    _ = pycoro.emit_and_wait(c, echo.EchoSubmission(r.payload.data))
+
+    msg = f"failed {r.payload.data}"
+    raise ValueError(msg)
+
+
+def test_system_records_failures() -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=10, completion_batch_size=10),
+    )
+    s.add_on_request("echo", failing_coroutine)
+
+    n = 3
+    received: list[Response[EchoResponse] | Exception] = []
+    for i in range(n):
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data=str(i))),
+                callback=received.append,
+            )
+        )
+
+    t = 0
+    s.tick(t)
+    while s.scheduler.size() > 0:
+        t += 1
+        s.tick(t)
+
+    failures = s.failures["echo"]
+    assert failures.count == n
+    assert isinstance(failures.last, ValueError)
+    assert str(failures.last) == "failed 2"
+
+    # every caller still gets a response
+    s.tick(t + 1)
+    assert len(received) == n
+    for res in received:
+        assert isinstance(res, Error)
+        assert res.code == StatusCode.STATUS_INTERNAL_SERVER_ERROR
+
+    _ = s.shutdown()
+    s.loop()
+
+
+async def asyncio_coroutine(
+    c: pycoro.AsyncCoroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Response[EchoResponse]:
+    # asyncio is not pycoro, the await fails this coroutine and nothing else
+    if r.payload.data == "sleep":
+        await asyncio.sleep(0)
+
+    return await async_echo_coroutine(c, r)
+
+
+@pytest.mark.parametrize("scheduler_workers", [1, 4])
+def test_system_foreign_yield(scheduler_workers: int) -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(
+            coroutine_max_size=100,
+            submission_batch_size=10,
+            completion_batch_size=10,
+            scheduler_workers=scheduler_workers,
+        ),
+    )
+    s.add_on_request("echo", asyncio_coroutine)
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    received = queue.Queue[Response[EchoResponse] | Exception]()
+    for data in ["sleep", "foo"]:
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data=data)), callback=received.put
+            )
+        )
+
+    results = [received.get(timeout=5), received.get(timeout=5)]
+    errors = [res for res in results if isinstance(res, Error)]
+    assert len(errors) == 1
+    assert errors[0].code == StatusCode.STATUS_INTERNAL_SERVER_ERROR
+    assert isinstance(errors[0].unwrap(), TypeError)
+    assert [res.payload.data for res in results if isinstance(res, Response)] == ["foo"]
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+def stalled_coroutine(c: pycoro.Coroutine[Kind, Kind, Any], _r: Request[EchoRequest]) -> Any:
+    return pycoro.wait(c, Future[Response[EchoResponse]]())
+
+
+def test_system_request_deadline() -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    api.start()
+    aio.start()
+
+    # without a signal timeout the loop has to wake up for the deadline
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=1, completion_batch_size=1),
+    )
+    s.add_on_request("echo", stalled_coroutine)
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    received = queue.Queue[Response[EchoResponse] | Exception]()
+    api.enqueue_sqe(
+        SQE[Request[EchoRequest], Response[EchoResponse]](
+            submission=Request(
+                payload=EchoRequest(data="foo"), deadline=int(time.time() * 1000) + 50
+            ),
+            callback=received.put,
+        )
+    )
+
+    res = received.get(timeout=5)
+    assert isinstance(res, Error)
+    assert res.code == StatusCode.STATUS_REQUEST_TIMEOUT
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+@pytest.mark.parametrize(
+    ("coroutine", "status"),
+    [
+        (echo_coroutine, StatusCode.STATUS_OK),
+        (failing_coroutine, StatusCode.STATUS_INTERNAL_SERVER_ERROR),
+    ],
+)
+def test_system_coalesces_requests(coroutine: Any, status: StatusCode) -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=10, completion_batch_size=10),
+    )
+    s.add_on_request("echo", coroutine, coalesce=lambda p: p.data)
+
+    # enqueued before the loop starts so every request is taken in one tick
+    received = queue.Queue[tuple[str, Response[EchoResponse] | Exception]]()
+    data = ["foo", "foo", "bar", "foo"]
+    for d in data:
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data=d)),
+                callback=lambda res, d=d: received.put((d, res)),
+            )
+        )
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    for _ in data:
+        d, res = received.get(timeout=5)
+        if isinstance(res, Error):
+            assert res.code == status
+        else:
+            assert not isinstance(res, Exception)
+            assert res.status == status
+            assert res.payload.data == d
+
+    keys = len(set(data))
+    coalescing = s.coalescing["echo"]
+    assert coalescing.hits == len(data) - keys
+    assert coalescing.misses == keys
+    assert coalescing.hit_ratio() == (len(data) - keys) / len(data)
+    assert len(s.inflight) == 0
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+def test_system_cache() -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=1, completion_batch_size=1),
+    )
+
+    calls: list[str] = []
+
+    def counting_coroutine(
+        c: pycoro.Coroutine[Kind, Kind, Any], r: Request[EchoRequest]
+    ) -> Response[EchoResponse]:
+        calls.append(r.payload.data)
+        if r.payload.data == "invalidate":
+            _ = c.get("caches")["echo"].invalidate("foo")
+        return echo_coroutine(c, r)
+
+    s.add_on_request(
+        "echo", counting_coroutine, cache=cache.Config(key=lambda p: p.data, ttl=60_000)
+    )
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    received = queue.Queue[Response[EchoResponse] | Exception]()
+    for data in ["foo", "foo", "invalidate", "foo"]:
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data=data)),
+                callback=received.put,
+            )
+        )
+        res = received.get(timeout=5)
+        assert not isinstance(res, Exception)
+        assert res.payload.data == data
+
+    # the second request is served from the cache, the last one is not
+    assert calls == ["foo", "invalidate", "foo"]
+
+    stats = s.caches["echo"].stats
+    assert stats.hits == 1
+    assert stats.invalidations == 1
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+def instant_coroutine(
+    _c: pycoro.Coroutine[Kind, Kind, Any], r: Request[EchoRequest]
+) -> Response[EchoResponse]:
+    return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(r.payload.data))
+
+
+def test_system_cache_callback_raises() -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    aio.add_subsystem(echo.new(aio, echo.Config(size=100, batch_size=1, workers=1)))
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=1, completion_batch_size=1),
+    )
+    s.add_on_request("echo", echo_coroutine, cache=cache.Config(key=lambda p: p.data, ttl=60_000))
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    received = queue.Queue[Response[EchoResponse] | Exception]()
+    raised = threading.Event()
+
+    def failing_callback(_res: Response[EchoResponse] | Exception) -> None:
+        raised.set()
+        msg = "foo"
+        raise ValueError(msg)
+
+    # a miss whose callback raises is not cached, one that does not fills the
+    # cache and a hit whose callback raises invalidates it again
+    for callback in [failing_callback, received.put, failing_callback, received.put]:
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data="foo")), callback=callback
+            )
+        )
+        if callback is failing_callback:
+            assert raised.wait(timeout=5)
+            raised.clear()
+            continue
+
+        res = received.get(timeout=5)
+        assert not isinstance(res, Exception)
+        assert res.payload.data == "foo"
+
+    stats = s.caches["echo"].stats
+    assert stats.misses == 3  # noqa: PLR2004
+    assert stats.hits == 1
+    assert stats.invalidations == 1
+    assert isinstance(s.failures["echo"].last, ValueError)
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+@pytest.mark.parametrize(
+    ("target", "initial", "sizes"),
+    [
+        # a backlog doubles the batch each tick up to the max
+        (timedelta(seconds=10), 1, [2, 4, 8, 8]),
+        # overrunning the target halves it down to the min
+        (timedelta(microseconds=1), 8, [4, 2, 1, 1]),
+    ],
+)
+def test_system_adaptive_batch(target: timedelta, initial: int, sizes: list[int]) -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(
+            coroutine_max_size=100,
+            submission_batch_size=initial,
+            completion_batch_size=1,
+            adaptive_batch=system.AdaptiveBatch(target=target, min_size=1, max_size=8),
+        ),
+    )
+    s.add_on_request("echo", instant_coroutine)
+
+    for i in range(50):
+        api.enqueue_sqe(
+            SQE[Request[EchoRequest], Response[EchoResponse]](
+                submission=Request(payload=EchoRequest(data=str(i))),
+                callback=lambda _: None,
+            )
+        )
+
+    for t, size in enumerate(sizes):
+        s.tick(t)
+        assert s.batch.submission == size
+        assert s.batch.tick_ns > 0
+
+    _ = s.shutdown()
+    s.loop()
+
+
+def test_system_background_intervals() -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    api.start()
+    aio.start()
+
+    s = system.new(
+        api,
+        aio,
+        system.Config(coroutine_max_size=100, submission_batch_size=1, completion_batch_size=1),
+    )
+
+    runs: list[tuple[str, int]] = []
+
+    def job(name: str) -> Callable[[pycoro.Coroutine[Kind, Kind, Any]], None]:
+        def _(c: pycoro.Coroutine[Kind, Kind, Any]) -> None:
+            runs.append((name, c.time()))
+
+        return _
+
+    s.add_background("fast", job("fast"), interval=timedelta(milliseconds=10))
+    s.add_background("slow", job("slow"), interval=timedelta(seconds=1))
+
+    # both are due on the first tick, only the fast one after that
+    for t in [0, 5, 10, 15, 20]:
+        s.tick(t)
+    assert runs == [("fast", 0), ("slow", 0), ("fast", 10), ("fast", 20)]
+
+    # the loop sleeps until the next job is due
+    assert s.timeout(25) == timedelta(milliseconds=5).total_seconds()
+
+    _ = s.shutdown()
+    s.loop()
+
+
+def test_system_unknown_priority() -> None:
+    s = system.new(
+        new_api(100),
+        new_aio(100),
+        system.Config(coroutine_max_size=100, submission_batch_size=1, completion_batch_size=1),
+    )
+
+    with pytest.raises(AssertionError, match="unknown priority class interactive"):
+        s.add_on_request("echo", echo_coroutine, priority="interactive")
+
+    with pytest.raises(AssertionError, match="unknown priority class interactive"):
+        s.add_background("job", lambda _c: None, priority="interactive")
+
+    assert "echo" not in s.on_request
+
+
+def test_system_background_runs_while_idle() -> None:
+    aio = new_aio(100)
+    api = new_api(100)
+    api.start()
+    aio.start()
+
+    # no signal timeout, nothing but the background job to wake the loop for
+    s = system.new(
+        api,
+        aio,
+        system.Config(
+            coroutine_max_size=100,
+            submission_batch_size=1,
+            completion_batch_size=1,
+            background_period=timedelta(milliseconds=10),
+        ),
+    )
+
+    runs = threading.Semaphore(0)
+
+    def job(_c: pycoro.Coroutine[Kind, Kind, Any]) -> None:
+        runs.release()
+
+    s.add_background("job", job)
+
+    loop = threading.Thread(target=s.loop, daemon=True)
+    loop.start()
+
+    for _ in range(5):
+        assert runs.acquire(timeout=5)
+
+    assert s.shutdown().wait(timeout=5)
+    loop.join()
+
+
+@pytest.mark.parametrize(("aio_size", "n"), [(100, 3), (4, 60)])
+def test_system_run_async(aio_size: int, n: int) -> None:
+    def task_coroutine(
+        c: pycoro.Coroutine[Kind, Kind, Any], r: Request[EchoRequest]
+    ) -> Response[EchoResponse]:
+        async def upper(data: str) -> str:
+            await asyncio.sleep(0)
+            return data.upper()
+
+        completion = pycoro.emit_and_wait(c, task.TaskSubmission(upper, (r.payload.data,)))
+        assert isinstance(completion, task.TaskCompletion)
+        assert isinstance(completion.result, str)
+
+        return Response(status=StatusCode.STATUS_OK, payload=EchoResponse(completion.result))
+
+    async def main() -> None:
+        loop = asyncio.get_running_loop()
+
+        # the system and its io share the event loop
+        # a completion queue smaller than the tasks in flight fills up, tasks
+        # finishing on the loop must not block the ticks that drain it
+        aio = new_aio(aio_size)
+        api = new_api(100)
+        aio.add_subsystem(task.new(aio, task.Config(size=n), loop))
+        api.start()
+        aio.start()
+
+        s = system.new(
+            api,
+            aio,
+            system.Config(coroutine_max_size=100, submission_batch_size=n, completion_batch_size=1),
+        )
+        s.add_on_request("echo", task_coroutine)
+        run = asyncio.create_task(s.run_async())
+
+        # callbacks run on whichever thread completes the request
+        def resolve(
+            future: asyncio.Future[Response[EchoResponse] | Exception],
+            res: Response[EchoResponse] | Exception,
+        ) -> None:
+            _ = loop.call_soon_threadsafe(future.set_result, res)
+
+        futures: list[asyncio.Future[Response[EchoResponse] | Exception]] = []
+        data = [f"foo{i}" for i in range(n)]
+        for d in data:
+            future = loop.create_future()
+            api.enqueue_sqe(
+                SQE[Request[EchoRequest], Response[EchoResponse]](
+                    submission=Request(payload=EchoRequest(data=d)),
+                    callback=partial(resolve, future),
+                )
+            )
+            futures.append(future)
+
+        async with asyncio.timeout(5):
+            for d, future in zip(data, futures, strict=True):
+                res = await future
+                assert not isinstance(res, Exception)
+                assert res.payload.data == d.upper()
+
+            _ = s.shutdown()
+            await run
+
+    # a blocked loop cannot time itself out, watch it from another thread
+    t = threading.Thread(target=asyncio.run, args=(main(),), daemon=True)
+    t.start()
+    t.join(timeout=10)
+    assert not t.is_alive()